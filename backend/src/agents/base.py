@@ -1,7 +1,7 @@
 """Base Agent class and Agent registry"""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, Tuple
 from src.models.conversation import AgentInfo
 import structlog
 
@@ -39,19 +39,23 @@ class AgentRegistry:
 
     def __init__(self):
         self._agents: Dict[str, BaseAgent] = {}
+        self._cached_infos: Optional[Tuple[AgentInfo, ...]] = None
 
     def register(self, agent: BaseAgent):
         """Register an agent"""
         self._agents[agent.name] = agent
+        self._cached_infos = None
         logger.info("Agent registered", name=agent.name)
 
     def get(self, name: str) -> Optional[BaseAgent]:
         """Get an agent by name"""
         return self._agents.get(name)
 
-    def list_agents(self) -> List[AgentInfo]:
-        """List all registered agents"""
-        return [agent.get_info() for agent in self._agents.values()]
+    def list_agents(self) -> Tuple[AgentInfo, ...]:
+        """List all registered agents (cached until the next register)"""
+        if self._cached_infos is None:
+            self._cached_infos = tuple(agent.get_info() for agent in self._agents.values())
+        return self._cached_infos
 
     def has_agent(self, name: str) -> bool:
         """Check if an agent is registered"""
@@ -1,14 +1,23 @@
 """Document Analysis Agent - Specialized for PDF, Excel and document processing"""
 
+import asyncio
+import re
 from typing import Dict, Any, List
 from pathlib import Path
 from src.agents.base import BaseAgent
-from src.services.document import DocumentService
+from src.services.document import document_service
 from src.core.llm_client import get_llm_response
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Words that suggest a document task even without attachments
+DOC_KEYWORDS = frozenset({"pdf", "excel", "xlsx", "csv", "summarize", "extract", "table"})
+_WORD_RE = re.compile(r"\w+")
+
+# Short prompt for requests that were routed here but have nothing to analyze
+GENERAL_SYSTEM_PROMPT = "You are a helpful AI assistant."
+
 
 class DocumentAnalysisAgent(BaseAgent):
     """Document analysis agent for PDF, Excel and other document types"""
@@ -18,7 +27,7 @@ class DocumentAnalysisAgent(BaseAgent):
         self.name = "DocumentAnalysis"
         self.description = "Specialized agent for analyzing PDF documents, Excel spreadsheets, and extracting structured data from various file formats"
         self.category = "document"
-        self.doc_service = DocumentService()
+        self.doc_service = document_service
 
     async def execute(
         self,
@@ -30,6 +39,17 @@ class DocumentAnalysisAgent(BaseAgent):
         context = context or {}
         attachment_ids = context.get("attachments", [])
 
+        # Mis-routed small talk: skip the document prompt entirely
+        if not attachment_ids and DOC_KEYWORDS.isdisjoint(_WORD_RE.findall(input_text.lower())):
+            try:
+                return await get_llm_response([
+                    {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
+                    {"role": "user", "content": input_text}
+                ])
+            except Exception as e:
+                logger.error("Document analysis failed", error=str(e))
+                return f"I apologize, but I encountered an error while processing your request: {str(e)}"
+
         system_prompt = """You are a Document Analysis Agent specialized in:
 - Analyzing PDF documents and extracting key information
 - Processing Excel spreadsheets and performing data analysis
@@ -44,26 +64,31 @@ Provide clear, well-structured analysis in Markdown format with:
 - Insights and recommendations
 - References to specific parts of the document"""
 
-        # Process attachments if present
-        document_content = ""
+        # Process attachments concurrently, keeping their original order
+        parts: List[str] = []
         if attachment_ids:
-            for file_id in attachment_ids:
-                try:
-                    content = await self.doc_service.process_file(file_id)
-                    document_content += f"\n\n--- Document Content ({file_id}) ---\n{content}\n--- End of Document ---\n"
-                except Exception as e:
-                    logger.error("Document processing failed", file_id=file_id, error=str(e))
-                    document_content += f"\n\nError processing document {file_id}: {str(e)}\n"
-
-        # Combine user query with document content
-        full_input = input_text
-        if document_content:
-            full_input = f"User Query: {input_text}\n\nDocument Content:\n{document_content}"
+            results = await asyncio.gather(
+                *[self.doc_service.process_file(file_id) for file_id in attachment_ids],
+                return_exceptions=True
+            )
+            for file_id, result in zip(attachment_ids, results):
+                if isinstance(result, Exception):
+                    logger.error("Document processing failed", file_id=file_id, error=str(result))
+                    parts.append(f"\n\nError processing document {file_id}: {str(result)}\n")
+                else:
+                    parts.append(f"\n\n--- Document Content ({file_id}) ---\n{result}\n--- End of Document ---\n")
+        document_content = "".join(parts)
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": full_input}
-        ]
+        # Send the document as its own message ahead of the query so that
+        # follow-up questions on the same file share a cacheable prefix
+        messages = [{"role": "system", "content": system_prompt}]
+        if document_content:
+            messages.append({
+                "role": "user",
+                "content": f"Document Content:\n{document_content}",
+                "cache_control": {"type": "ephemeral"}
+            })
+        messages.append({"role": "user", "content": input_text})
 
         try:
             response = await get_llm_response(messages)
@@ -1,40 +1,41 @@
 """Supervisor Agent - Main intent recognition and routing agent"""
 
-import json
-from typing import Dict, Any, Optional, List
+import asyncio
+import hashlib
+import re
+import threading
+from typing import Dict, Any, Hashable, Optional, List
 from src.agents.base import BaseAgent, agent_registry
-from src.core.llm_client import get_llm_response
+from src.config import settings
+from src.core.llm_client import BAD_REQUEST_ERRORS, get_llm_response
 from src.models.conversation import IntentResult
+from src.utils.cache import LRUCache
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Outermost JSON object in an LLM reply (tolerates chatter or code fences around it)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.S)
 
-class SupervisorAgent(BaseAgent):
-    """Supervisor agent for intent recognition and routing"""
+# Unambiguous keyword routes that skip the LLM round-trip. Document keywords
+# only count when files are attached; otherwise financial keywords apply.
+_DOCUMENT_KEYWORDS_RE = re.compile(
+    r"\b(?:summari[sz]e|analy[sz]e|extract|pdf|excel|spreadsheet|csv|document|attachment|file)s?\b"
+    r"|总结|摘要|分析|文档|附件|文件",
+    re.I
+)
+# Only terms with no everyday meaning ("stock" alone also means broth,
+# inventory or photos); anything ambiguous goes to the LLM classifier.
+_FINANCIAL_KEYWORDS_RE = re.compile(
+    r"\b(?:bitcoin|btc|ethereum|cryptocurrenc(?:y|ies)|(?:stock|share) prices?|"
+    r"nasdaq|nyse|dow jones|s&p 500|forex|exchange rates?|market cap|trading signals?)\b"
+    r"|(?<![\w$])(?-i:\$[A-Z]{1,5})\b"
+    r"|比特币|以太坊|股票|股价|汇率",
+    re.I
+)
+_FAST_ROUTE_CONFIDENCE = 0.9
 
-    def __init__(self):
-        super().__init__()
-        self.name = "Supervisor"
-        self.description = "Main agent that recognizes user intent and routes to appropriate specialized agents"
-        self.category = "supervisor"
-
-    async def recognize_intent(
-        self,
-        user_message: str,
-        context: Dict[str, Any] = None
-    ) -> IntentResult:
-        """Recognize user intent using LLM"""
-
-        # Get available agents
-        available_agents = agent_registry.list_agents()
-        agent_list = "\n".join([
-            f"- {agent.name}: {agent.description} (category: {agent.category})"
-            for agent in available_agents
-            if agent.name != "Supervisor"
-        ])
-
-        system_prompt = f"""You are the Supervisor agent for an AI assistant. Your role is to:
+SYSTEM_PROMPT_TEMPLATE = """You are the Supervisor agent for an AI assistant. Your role is to:
 
 1. Analyze the user's message and understand their intent
 2. Decide which specialized agent should handle this request, or if it should be handled directly by the main LLM
@@ -56,6 +57,8 @@ Return a JSON object with this exact format:
     "reasoning": "brief explanation"
 }}
 
+Set "agent" to one of the agent names above, or null when no specialized agent is needed.
+
 Examples:
 User: "What's the price of Bitcoin?"
 Response: {{"intent": "crypto_price_query", "confidence": 0.95, "agent": "FinancialAnalysis", "reasoning": "User is asking for cryptocurrency pricing information"}}
@@ -67,18 +70,149 @@ User: "Tell me a joke"
 Response: {{"intent": "general_chat", "confidence": 0.9, "agent": null, "reasoning": "General conversation request, no specialized agent needed"}}
 """
 
+
+def _strict_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Adapt a Pydantic JSON schema for strict structured output"""
+    properties = {
+        name: {k: v for k, v in prop.items() if k != "default"}
+        for name, prop in schema["properties"].items()
+    }
+    # Strict mode requires every property to be listed and no extras allowed
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+# Provider-enforced output shape for routing decisions
+INTENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "IntentResult",
+        "schema": _strict_json_schema(IntentResult.model_json_schema()),
+        "strict": True
+    }
+}
+
+
+HISTORY_SUMMARY_PROMPT = """Summarize the conversation below in a few sentences. Keep facts, names, numbers and open questions the assistant may need later. Reply with the summary only."""
+
+# Summaries of older history blocks, keyed by (conversation id, block start)
+# or by a hash of the block
+HISTORY_SUMMARY_CACHE_SIZE = 4096
+
+
+class SupervisorAgent(BaseAgent):
+    """Supervisor agent for intent recognition and routing"""
+
+    def __init__(self):
+        super().__init__()
+        self.name = "Supervisor"
+        self.description = "Main agent that recognizes user intent and routes to appropriate specialized agents"
+        self.category = "supervisor"
+        self._agent_list_cached: Optional[str] = None
+        self._system_prompt_cached: Optional[str] = None
+        self._prompt_agents: Optional[tuple] = None
+        self._prompt_lock = threading.Lock()
+        # Routing is deterministic for a given message, so identical messages
+        # can reuse the previous decision instead of another LLM round-trip
+        self._intent_cache = LRUCache(
+            maxsize=settings.intent_cache_size,
+            ttl=settings.intent_cache_ttl
+        )
+        self._summary_cache = LRUCache(maxsize=HISTORY_SUMMARY_CACHE_SIZE)
+        # In-flight routing calls by intent cache key, so concurrent identical
+        # messages share one LLM call
+        self._intent_inflight: Dict[bytes, asyncio.Task] = {}
+        # Cleared once the provider rejects response_format; routing then
+        # relies on the prompt's format description alone
+        self._structured_output = True
+
+    @staticmethod
+    def _intent_cache_key(user_message: str) -> bytes:
+        """Build the intent cache key for a message"""
+        return hashlib.blake2b(user_message.strip().lower().encode(), digest_size=16).digest()
+
+    @staticmethod
+    def _fast_route(user_message: str, context: Dict[str, Any] = None) -> Optional[IntentResult]:
+        """Route obvious requests by keyword, or return None to defer to the LLM"""
+        if context and context.get("attachments"):
+            if _DOCUMENT_KEYWORDS_RE.search(user_message):
+                agent, intent = "DocumentAnalysis", "document_analysis"
+            else:
+                return None
+        elif _FINANCIAL_KEYWORDS_RE.search(user_message):
+            agent, intent = "FinancialAnalysis", "financial_query"
+        else:
+            return None
+
+        if not agent_registry.has_agent(agent):
+            return None
+
+        return IntentResult(
+            intent=intent,
+            confidence=_FAST_ROUTE_CONFIDENCE,
+            agent=agent,
+            reasoning="keyword match"
+        )
+
+    def _build_system_prompt(self) -> str:
+        """Build the routing system prompt, cached until the registry changes"""
+
+        # Keep the prompt byte-identical across calls so provider-side prompt
+        # caching can reuse it; per-request data belongs in the user turn.
+        # The registry returns the same tuple until an agent is registered
+        agents = agent_registry.list_agents()
+        if self._prompt_agents is agents:
+            return self._system_prompt_cached
+
+        with self._prompt_lock:
+            if self._prompt_agents is not agents:
+                self._agent_list_cached = "\n".join([
+                    f"- {agent.name}: {agent.description} (category: {agent.category})"
+                    for agent in agents
+                    if agent.name != self.name
+                ])
+                self._system_prompt_cached = SYSTEM_PROMPT_TEMPLATE.format(
+                    agent_list=self._agent_list_cached
+                )
+                self._prompt_agents = agents
+
+        return self._system_prompt_cached
+
+    async def recognize_intent(
+        self,
+        user_message: str,
+        context: Dict[str, Any] = None
+    ) -> IntentResult:
+        """Recognize user intent using LLM"""
+
+        fast_result = self._fast_route(user_message, context)
+        if fast_result is not None:
+            return fast_result
+
+        cache_key = self._intent_cache_key(user_message)
+        if settings.intent_cache_enabled:
+            cached = self._intent_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ]
+            task = self._intent_inflight.get(cache_key)
+            if task is None:
+                task = asyncio.create_task(self._classify_intent(user_message))
+                self._intent_inflight[cache_key] = task
+                task.add_done_callback(lambda _: self._intent_inflight.pop(cache_key, None))
 
-            response = await get_llm_response(messages)
+            # Shielded so one caller going away does not cancel the others
+            result = await asyncio.shield(task)
 
-            # Parse JSON response
-            result_data = json.loads(response)
+            if settings.intent_cache_enabled:
+                self._intent_cache.set(cache_key, result)
 
-            return IntentResult(**result_data)
+            return result
 
         except Exception as e:
             logger.error("Intent recognition failed", error=str(e))
@@ -90,6 +224,109 @@ Response: {{"intent": "general_chat", "confidence": 0.9, "agent": null, "reasoni
                 reasoning="Intent recognition failed, defaulting to general chat"
             )
 
+    async def _classify_intent(self, user_message: str) -> IntentResult:
+        """Ask the LLM to route a message"""
+        messages = [
+            {"role": "system", "content": self._build_system_prompt()},
+            {"role": "user", "content": user_message}
+        ]
+
+        if self._structured_output:
+            try:
+                response = await get_llm_response(messages, response_format=INTENT_RESPONSE_FORMAT)
+            except BAD_REQUEST_ERRORS as e:
+                # Many OpenAI-compatible backends reject json_schema output;
+                # retry once without it and stop sending it if that works
+                logger.warning("Structured intent output rejected, retrying without it", error=str(e))
+                response = await get_llm_response(messages)
+                self._structured_output = False
+        else:
+            response = await get_llm_response(messages)
+
+        # Output is schema-constrained where the provider supports it; the
+        # prompt spells out the format for those that ignore response_format,
+        # and the regex tolerates replies that wrap the JSON in chatter or fences
+        match = _JSON_OBJECT_RE.search(response)
+        return IntentResult.model_validate_json(match.group(0) if match else response)
+
+    async def _summarize_history(
+        self,
+        history: List[Dict[str, Any]],
+        key: Optional[Hashable] = None
+    ) -> Optional[str]:
+        """Summarize older conversation turns, cached by key (default: content hash)"""
+        if key is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for msg in history:
+                digest.update(f"{msg['role']}\x00{msg['content']}\x1e".encode())
+            key = digest.digest()
+
+        summary = self._summary_cache.get(key)
+        if summary is not None:
+            return summary
+
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history)
+        try:
+            summary = await get_llm_response([
+                {"role": "system", "content": HISTORY_SUMMARY_PROMPT},
+                {"role": "user", "content": transcript}
+            ])
+        except Exception as e:
+            logger.warning("History summarization failed", error=str(e))
+            return None
+
+        self._summary_cache.set(key, summary)
+        return summary
+
+    async def _trim_history(
+        self,
+        history: List[Dict[str, Any]],
+        message_count: Optional[int] = None,
+        conversation_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Bound the history sent to the LLM: recent turns verbatim, older ones summarized.
+
+        Args:
+            history: Most recent messages of the conversation, oldest first
+            message_count: Total messages in the conversation (history may be
+                only its tail); defaults to len(history)
+            conversation_id: Conversation UUID, used to cache block summaries by
+                position; without it they are cached by content
+        """
+        window = settings.chat_history_max_turns * 2
+        if window <= 0 or len(history) <= window:
+            return history
+
+        # Everything before the cut is summarized in fixed blocks of absolute
+        # message positions, each summarized once and reused while the tail
+        # moves; the cut is the first block boundary that leaves at most
+        # window messages verbatim
+        block = max(window // 2, 1)
+        total = max(message_count or 0, len(history))
+        offset = total - len(history)
+        cut = -(-(total - window) // block) * block
+
+        starts = range(offset // block * block, cut, block)
+        summaries = await asyncio.gather(*(
+            self._summarize_history(
+                history[max(start, offset) - offset:start + block - offset],
+                (conversation_id, start) if conversation_id else None
+            )
+            for start in starts
+        ))
+
+        recent = history[cut - offset:]
+        summaries = [summary for summary in summaries if summary]
+        if not summaries:
+            return recent
+
+        summary = "\n\n".join(summaries)
+        return [
+            {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"},
+            *recent
+        ]
+
     async def execute(
         self,
         input_text: str,
@@ -112,9 +349,14 @@ Response: {{"intent": "general_chat", "confidence": 0.9, "agent": null, "reasoni
             agent = agent_registry.get(intent_result.agent)
             return await agent.execute(input_text, context)
 
-        # Handle directly with LLM
-        messages = context.get("messages", [])
-        messages.append({"role": "user", "content": input_text})
+        # Handle directly with LLM (build a new list; the caller's history is shared)
+        context = context or {}
+        history = await self._trim_history(
+            context.get("messages", []),
+            context.get("message_count"),
+            context.get("conversation_id")
+        )
+        messages = [*history, {"role": "user", "content": input_text}]
 
         response = await get_llm_response(messages)
         return response
@@ -38,8 +38,9 @@ async def get_users(
 
     users, total = await list_users(skip=skip, limit=limit, search=search)
 
+    # Rows come from our own UserResponse projection, so skip re-validation
     return {
-        "users": [UserResponse(**user) for user in users],
+        "users": [UserResponse.model_construct(**user) for user in users],
         "total": total,
         "skip": skip,
         "limit": limit
@@ -100,41 +101,29 @@ async def update_user_info(
     Raises:
         HTTPException: If user not found, trying to ban self, or not admin
     """
-    # Check if user exists
-    target_user = await get_user_by_id(user_id)
-    if not target_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    # Prevent admin from banning themselves
-    if user_id == current_user.id and updates.is_banned is not None and updates.is_banned:
+    # Prevent admin from banning themselves (checked before any DB I/O)
+    if user_id == current_user.id and updates.is_banned:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Cannot ban your own account"
         )
 
+    # Build update dict
+    update_data = updates.model_dump(exclude_unset=True, exclude_none=True)
+
     logger.info(
         "Admin updating user",
         admin_id=current_user.id,
         target_user_id=user_id,
-        updates=updates.model_dump(exclude_unset=True)
+        updates=update_data
     )
 
-    # Build update dict
-    update_data = {}
-    if updates.subscription_level is not None:
-        update_data["subscription_level"] = updates.subscription_level
-    if updates.is_banned is not None:
-        update_data["is_banned"] = updates.is_banned
-
-    # Update user
+    # Update user (existence check and update in one round-trip)
     updated_user = await update_user(user_id, update_data)
     if not updated_user:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update user"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
         )
 
     logger.info(
@@ -143,7 +132,7 @@ async def update_user_info(
         target_user_id=user_id
     )
 
-    return UserResponse(**updated_user)
+    return UserResponse.model_construct(**updated_user)
 
 
 @router.post("/users/{user_id}/ban")
@@ -173,22 +162,14 @@ async def ban_user_account(
 
     logger.info("Admin banning user", admin_id=current_user.id, target_user_id=user_id)
 
-    # Check if user exists
-    target_user = await get_user_by_id(user_id)
-    if not target_user:
+    # Ban user (existence check and update in one round-trip)
+    updated_user = await ban_user(user_id)
+    if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    # Ban user
-    success = await ban_user(user_id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to ban user"
-        )
-
     logger.info("User banned successfully", admin_id=current_user.id, target_user_id=user_id)
 
     return {"message": "User banned successfully"}
@@ -214,22 +195,14 @@ async def unban_user_account(
     """
     logger.info("Admin unbanning user", admin_id=current_user.id, target_user_id=user_id)
 
-    # Check if user exists
-    target_user = await get_user_by_id(user_id)
-    if not target_user:
+    # Unban user (existence check and update in one round-trip)
+    updated_user = await unban_user(user_id)
+    if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    # Unban user
-    success = await unban_user(user_id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to unban user"
-        )
-
     logger.info("User unbanned successfully", admin_id=current_user.id, target_user_id=user_id)
 
     return {"message": "User unbanned successfully"}
@@ -1,13 +1,17 @@
 """Authentication API routes: register, login, captcha"""
 
+import asyncio
 from fastapi import APIRouter, HTTPException, status, Depends
 from src.models.user import (
     UserCreate, UserLogin, TokenResponse, CaptchaResponse, UserResponse
 )
-from src.core.auth import captcha_generator, create_access_token, get_password_hash, verify_password
+from src.core.auth import (
+    captcha_generator, create_access_token, get_password_hash, verify_password, password_needs_rehash,
+    DUMMY_PASSWORD_HASH
+)
 from src.core.dependencies import get_current_user, user_to_response
 from src.db.mongo import (
-    create_user, get_user_by_username, update_user_last_login, get_user_by_id
+    create_user, get_user_by_username, update_user_last_login, get_user_by_id, update_user
 )
 import structlog
 
@@ -24,7 +28,7 @@ async def get_captcha():
     Returns:
         CaptchaResponse with captcha_id and base64 encoded image
     """
-    captcha_id, image = captcha_generator.generate_captcha()
+    captcha_id, image = await captcha_generator.generate_captcha()
     return CaptchaResponse(captcha_id=captcha_id, image=image)
 
 
@@ -49,7 +53,7 @@ async def register(user_data: UserCreate):
     """
     # Verify captcha only if provided (captcha is now optional)
     if user_data.captcha_code and user_data.captcha_id:
-        if not captcha_generator.verify_captcha(user_data.captcha_id, user_data.captcha_code):
+        if not await captcha_generator.verify_captcha(user_data.captcha_id, user_data.captcha_code):
             logger.warning("Registration failed: invalid captcha", username=user_data.username)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,7 +70,7 @@ async def register(user_data: UserCreate):
         )
 
     # Create user with hashed password
-    password_hash = get_password_hash(user_data.password)
+    password_hash = await get_password_hash(user_data.password)
     user_doc = await create_user(
         username=user_data.username,
         password_hash=password_hash,
@@ -114,8 +118,15 @@ async def login(user_data: UserLogin):
     Raises:
         HTTPException: If credentials invalid, captcha invalid, or account banned/inactive
     """
-    # Verify captcha first
-    if not captcha_generator.verify_captcha(user_data.captcha_id, user_data.captcha_code):
+    # Consume the captcha (Redis) and look up the user (Mongo) concurrently;
+    # the two are independent, so only the slower round-trip is paid
+    captcha_ok, user = await asyncio.gather(
+        captcha_generator.verify_captcha(user_data.captcha_id, user_data.captcha_code),
+        get_user_by_username(user_data.username)
+    )
+
+    # Captcha is still checked first
+    if not captcha_ok:
         logger.warning("Login failed: invalid captcha", username=user_data.username)
         # Don't reveal if username exists for security
         raise HTTPException(
@@ -123,9 +134,8 @@ async def login(user_data: UserLogin):
             detail="Invalid credentials"
         )
 
-    # Get user
-    user = await get_user_by_username(user_data.username)
     if not user:
+        await verify_password(user_data.password, DUMMY_PASSWORD_HASH)
         logger.warning("Login failed: user not found", username=user_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -133,7 +143,7 @@ async def login(user_data: UserLogin):
         )
 
     # Verify password
-    if not verify_password(user_data.password, user["password_hash"]):
+    if not await verify_password(user_data.password, user["password_hash"]):
         logger.warning("Login failed: invalid password", username=user_data.username, user_id=user["id"])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -156,6 +166,11 @@ async def login(user_data: UserLogin):
             detail="Account is inactive"
         )
 
+    # Upgrade hashes created with outdated Argon2 parameters
+    if password_needs_rehash(user["password_hash"]):
+        await update_user(user["id"], {"password_hash": await get_password_hash(user_data.password)})
+        logger.info("Password hash upgraded", user_id=user["id"])
+
     # Update last login
     await update_user_last_login(user["id"])
 
@@ -1,25 +1,24 @@
 """Chat API endpoints - WebSocket and HTTP for streaming chat with user isolation"""
 
-import json
+import asyncio
 import uuid
-from datetime import datetime
+import orjson
 from typing import List
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from src.models.user import User
 from src.models.conversation import MessageCreate, ChatResponse
-from src.core.llm_client import get_llm_response
+from src.core.dependencies import get_current_user, get_user_from_token
+from src.core.llm_client import get_llm_response, get_llm_response_stream
 from src.core.streaming import StreamChunk
-from src.core.auth import decode_access_token
-from src.db.mongo import get_conversation_for_user, add_message_to_conversation
+from src.db.mongo import get_conversation_tail, add_messages_batch
 from src.agents import agent_registry
 from src.services.attachment import attachment_service
+from src.utils.clock import utc_now
 import structlog
 
 logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
-security = HTTPBearer()
 
 
 class ConnectionManager:
@@ -36,43 +35,45 @@ class ConnectionManager:
 
     def disconnect(self, conv_id: str):
         """Remove WebSocket connection"""
-        if conv_id in self.active_connections:
-            del self.active_connections[conv_id]
+        if self.active_connections.pop(conv_id, None) is not None:
             logger.info("WebSocket disconnected", conv_id=conv_id)
 
     async def send_message(self, conv_id: str, message: str):
         """Send message to specific conversation"""
-        if conv_id in self.active_connections:
-            await self.active_connections[conv_id][0].send_text(message)
+        connection = self.active_connections.get(conv_id)
+        if connection is not None:
+            await connection[0].send_text(message)
 
 
 # Global connection manager
 manager = ConnectionManager()
 
+# Streamed content frame and final "done" frame; only the content and message
+# id vary. message_id is a server-generated UUID, so it is safe to interpolate
+# without JSON escaping; content must already be a JSON string literal.
+_CHUNK_TMPL = '{{"content":{content},"done":false,"metadata":{{"message_id":"{mid}"}}}}'
+_FINAL_TMPL = '{{"content":"","done":true,"metadata":{{"message_id":"{mid}"}}}}'
 
-async def get_user_from_token(token: str) -> User:
-    """Extract and validate user from JWT token"""
-    payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Largest inbound WebSocket message accepted, in bytes; bigger frames close
+# with 1009. uvicorn's ws max size is set to match (start.sh, main.py) so
+# oversized frames are refused before they are buffered.
+MAX_WS_MESSAGE_SIZE = 64 * 1024
 
-    user_id = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Most recent messages loaded as chat context (the supervisor trims further)
+HISTORY_MESSAGE_LIMIT = 50
 
-    from src.db.mongo import get_user_by_id
-    user = await get_user_by_id(user_id)
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return User(**user)
+# Streamed tokens are sent once this many characters are buffered or this
+# many seconds have passed since the last send, whichever comes first (a
+# timer flushes the buffer even when the LLM stalls between tokens)
+STREAM_FLUSH_CHARS = 512
+STREAM_FLUSH_INTERVAL = 0.016
 
 
 @router.post("/{conv_id}")
 async def send_message(
     conv_id: str,
     message: MessageCreate,
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    user: User = Depends(get_current_user)
 ):
     """
     Send a message and get AI response (non-streaming).
@@ -80,7 +81,7 @@ async def send_message(
     Args:
         conv_id: Conversation UUID
         message: Message to send
-        credentials: JWT token
+        user: Authenticated user
 
     Returns:
         ChatResponse with AI response
@@ -88,23 +89,19 @@ async def send_message(
     Raises:
         HTTPException: If conversation not found or access denied
     """
-    # Get user from token
-    user = await get_user_from_token(credentials.credentials)
-
     logger.info("Sending message", conv_id=conv_id, user_id=user.id)
 
     # Get conversation with user ownership check
-    conversation = await get_conversation_for_user(conv_id, user.id)
+    conversation = await get_conversation_tail(conv_id, user.id, HISTORY_MESSAGE_LIMIT)
     if not conversation:
         logger.warning("Message failed: conversation not found or access denied", conv_id=conv_id, user_id=user.id)
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Build message history
+    # Build message history (the supervisor adds the current message itself)
     messages = [
         {"role": msg["role"], "content": msg["content"]}
         for msg in conversation.get("messages", [])
     ]
-    messages.append({"role": "user", "content": message.content})
 
     # Get response from supervisor agent
     supervisor = agent_registry.get("Supervisor")
@@ -112,34 +109,30 @@ async def send_message(
     try:
         response = await supervisor.execute(
             message.content,
-            context={"messages": messages, "attachments": message.attachments}
+            context={
+                "messages": messages,
+                "message_count": conversation.get("message_count", len(messages)),
+                "conversation_id": conv_id,
+                "attachments": message.attachments
+            }
         )
     except Exception as e:
         logger.error("Chat response failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Save messages to database
-    await add_message_to_conversation(
-        conv_id=conv_id,
-        user_id=user.id,
-        role="user",
-        content=message.content,
-        attachments=message.attachments
-    )
-
-    updated_conversation = await add_message_to_conversation(
-        conv_id=conv_id,
-        user_id=user.id,
-        role="assistant",
-        content=response
-    )
+    # Save both messages in one write, overlapped with attachment cleanup
+    now = utc_now()
+    async with asyncio.TaskGroup() as tg:
+        save_task = tg.create_task(add_messages_batch(conv_id, user.id, [
+            {"role": "user", "content": message.content, "attachments": message.attachments},
+            {"role": "assistant", "content": response}
+        ], now))
+        if message.attachments:
+            tg.create_task(attachment_service.cleanup_files(message.attachments))
 
     # Get the message ID from the last message
-    message_id = updated_conversation["messages"][-1]["id"] if updated_conversation["messages"] else str(uuid.uuid4())
-
-    # Clean up attachments
-    if message.attachments:
-        await attachment_service.cleanup_files(message.attachments)
+    saved = save_task.result()
+    message_id = saved[-1]["id"] if saved else uuid.uuid4().hex
 
     logger.info("Message sent successfully", conv_id=conv_id, user_id=user.id)
 
@@ -163,30 +156,34 @@ async def websocket_chat(websocket: WebSocket, conv_id: str, token: str = Query(
         conv_id: Conversation UUID
     """
 
-    # Authenticate user from token
+    # Authenticate user from token (lookup errors fail auth, not the socket)
     try:
         user = await get_user_from_token(token)
     except Exception as e:
+        logger.error("WebSocket authentication failed", conv_id=conv_id, error=str(e))
+        user = None
+
+    if user is None:
         await websocket.accept()
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(orjson.dumps({
             "content": "",
             "done": True,
             "metadata": {},
             "error": "Authentication failed"
-        }))
+        }).decode())
         await websocket.close()
         return
 
     # Verify user has access to this conversation
-    conversation = await get_conversation_for_user(conv_id, user.id)
+    conversation = await get_conversation_tail(conv_id, user.id, HISTORY_MESSAGE_LIMIT)
     if not conversation:
         await websocket.accept()
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(orjson.dumps({
             "content": "",
             "done": True,
             "metadata": {},
             "error": "Conversation not found"
-        }))
+        }).decode())
         await websocket.close()
         return
 
@@ -196,9 +193,20 @@ async def websocket_chat(websocket: WebSocket, conv_id: str, token: str = Query(
 
     try:
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+            # Receive message from client (text or binary frame)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+
+            # Size text frames in UTF-8 bytes, as on the wire
+            data = frame.get("bytes") or (frame.get("text") or "").encode()
+            if len(data) > MAX_WS_MESSAGE_SIZE:
+                logger.warning("WebSocket message too large", conv_id=conv_id, user_id=user.id, size=len(data))
+                await websocket.close(code=1009)
+                manager.disconnect(conv_id)
+                return
+
+            message_data = orjson.loads(data)
 
             content = message_data.get("content", "")
             attachments = message_data.get("attachments", [])
@@ -211,59 +219,77 @@ async def websocket_chat(websocket: WebSocket, conv_id: str, token: str = Query(
                 for msg in conversation.get("messages", [])
             ]
             messages.append({"role": "user", "content": content})
+            user_message = {"role": "user", "content": content, "attachments": attachments}
+            turn_time = utc_now()
 
-            # Save user message
-            await add_message_to_conversation(
-                conv_id=conv_id,
-                user_id=user.id,
-                role="user",
-                content=content,
-                attachments=attachments
+            # Save the user's message in the background while the reply
+            # streams; it is awaited below however the stream ends
+            save_user = asyncio.create_task(
+                add_messages_batch(conv_id, user.id, [user_message], turn_time)
             )
 
-            # Get streaming response from LLM
-            from src.core.llm_client import get_llm_response_stream
-
             # Build full response
-            full_response = ""
-            message_id = str(uuid.uuid4())
+            parts: List[str] = []
+            message_id = uuid.uuid4().hex
+            full_response = None
 
             try:
-                # Get streaming response
-                async for chunk in get_llm_response_stream(messages):
-                    # Send each chunk
-                    stream_chunk = StreamChunk(
-                        content=chunk,
-                        done=False,
-                        metadata={"message_id": message_id}
-                    )
-                    await websocket.send_text(stream_chunk.to_json())
-                    full_response += chunk
+                # Coalesce token chunks into fewer frames (flush by size or age)
+                loop = asyncio.get_running_loop()
+                buf: List[str] = []
+                buf_len = 0
+                last_flush = loop.time()
+                stream = get_llm_response_stream(messages)
+                pending = None
+
+                try:
+                    while True:
+                        if pending is None:
+                            pending = asyncio.ensure_future(anext(stream))
+
+                        # While tokens are buffered, wait no longer than the
+                        # flush interval so a stalled stream still flushes them
+                        timeout = None
+                        if buf:
+                            timeout = max(last_flush + STREAM_FLUSH_INTERVAL - loop.time(), 0)
+                        done, _ = await asyncio.wait((pending,), timeout=timeout)
+
+                        if done:
+                            try:
+                                chunk = pending.result()
+                            except StopAsyncIteration:
+                                break
+                            finally:
+                                pending = None
+
+                            parts.append(chunk)
+                            buf.append(chunk)
+                            buf_len += len(chunk)
+                            if (buf_len < STREAM_FLUSH_CHARS
+                                    and loop.time() - last_flush < STREAM_FLUSH_INTERVAL):
+                                continue
+
+                        await websocket.send_text(_CHUNK_TMPL.format(
+                            content=orjson.dumps("".join(buf)).decode(),
+                            mid=message_id
+                        ))
+                        buf.clear()
+                        buf_len = 0
+                        last_flush = loop.time()
+                finally:
+                    if pending is not None:
+                        pending.cancel()
+
+                if buf:
+                    await websocket.send_text(_CHUNK_TMPL.format(
+                        content=orjson.dumps("".join(buf)).decode(),
+                        mid=message_id
+                    ))
+
+                full_response = "".join(parts)
 
                 # Send final chunk
-                final_chunk = StreamChunk(
-                    content="",
-                    done=True,
-                    metadata={"message_id": message_id}
-                )
-                await websocket.send_text(final_chunk.to_json())
-
-                # Save assistant message
-                await add_message_to_conversation(
-                    conv_id=conv_id,
-                    user_id=user.id,
-                    role="assistant",
-                    content=full_response
-                )
-
-                # Update conversation reference
-                conversation = await get_conversation_for_user(conv_id, user.id)
-
-                # Clean up attachments
-                if attachments:
-                    await attachment_service.cleanup_files(attachments)
-
-                logger.info("WebSocket response sent", conv_id=conv_id, user_id=user.id)
+                await websocket.send_text(_FINAL_TMPL.format(mid=message_id))
 
             except Exception as e:
                 logger.error("Chat streaming failed", error=str(e))
@@ -275,6 +301,32 @@ async def websocket_chat(websocket: WebSocket, conv_id: str, token: str = Query(
                 )
                 await websocket.send_text(error_chunk.to_json())
 
+            finally:
+                # Record what the user sent even if the client went away
+                await save_user
+
+            if full_response is None:
+                continue
+
+            # Save the assistant message after the user's, overlapped with
+            # attachment cleanup
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(add_messages_batch(conv_id, user.id, [
+                    {"role": "assistant", "content": full_response, "id": message_id}
+                ], turn_time))
+                if attachments:
+                    tg.create_task(attachment_service.cleanup_files(attachments))
+
+            # Keep the local history in step instead of refetching the conversation
+            history = conversation.setdefault("messages", [])
+            history.extend([
+                {"role": "user", "content": content},
+                {"role": "assistant", "content": full_response}
+            ])
+            del history[:-HISTORY_MESSAGE_LIMIT]
+
+            logger.info("WebSocket response sent", conv_id=conv_id, user_id=user.id)
+
     except WebSocketDisconnect:
         manager.disconnect(conv_id)
         logger.info("WebSocket disconnected normally", conv_id=conv_id, user_id=user.id)
@@ -2,13 +2,16 @@
 
 from typing import List
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import ORJSONResponse
 from src.models.conversation import Conversation, ConversationCreate, ConversationUpdate
 from src.models.user import User
 from src.core.dependencies import get_current_user
 from src.db.mongo import (
     get_user_conversations,
     create_conversation,
-    get_conversation_for_user
+    get_conversation_for_user,
+    update_conversation_for_user,
+    delete_conversation_for_user
 )
 import structlog
 
@@ -42,7 +45,9 @@ async def list_conversations(
         limit=limit
     )
 
-    return [Conversation(**conv) for conv in conversations]
+    # Documents are already projected to the Conversation shape; returning the
+    # response directly skips per-item model construction and validation
+    return ORJSONResponse(conversations)
 
 
 @router.post("", response_model=Conversation, status_code=status.HTTP_201_CREATED)
@@ -124,29 +129,14 @@ async def delete_conversation(
     """
     logger.info("Deleting conversation", conv_id=conv_id, user_id=current_user.id)
 
-    # Check ownership first
-    conversation = await get_conversation_for_user(conv_id, current_user.id)
-    if not conversation:
+    # Ownership check and delete in one round-trip
+    if not await delete_conversation_for_user(conv_id, current_user.id):
         logger.warning("Delete failed: conversation not found or access denied", conv_id=conv_id, user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
 
-    # Delete the conversation
-    from src.db.mongo import mongodb
-    db = mongodb.get_db()
-    result = await db.conversations.delete_one({
-        "id": conv_id,
-        "user_id": current_user.id
-    })
-
-    if result.deleted_count == 0:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-
     logger.info("Conversation deleted", conv_id=conv_id, user_id=current_user.id)
 
     return {"message": "Conversation deleted"}
@@ -174,38 +164,22 @@ async def update_conversation(
     """
     logger.info("Updating conversation", conv_id=conv_id, user_id=current_user.id)
 
-    # Check ownership first
-    conversation = await get_conversation_for_user(conv_id, current_user.id)
-    if not conversation:
-        logger.warning("Update failed: conversation not found or access denied", conv_id=conv_id, user_id=current_user.id)
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
+    # Nothing to change: return the conversation as stored
+    if data.title is None:
+        updated_conversation = await get_conversation_for_user(conv_id, current_user.id)
+    else:
+        # Ownership check and update in one round-trip
+        updated_conversation = await update_conversation_for_user(
+            conv_id, current_user.id, {"title": data.title}
         )
 
-    # Update the conversation
-    from src.db.mongo import mongodb
-    from datetime import datetime
-
-    db = mongodb.get_db()
-    update_data = {"updated_at": datetime.utcnow()}
-    if data.title is not None:
-        update_data["title"] = data.title
-
-    result = await db.conversations.update_one(
-        {"id": conv_id, "user_id": current_user.id},
-        {"$set": update_data}
-    )
-
-    if result.matched_count == 0:
+    if not updated_conversation:
+        logger.warning("Update failed: conversation not found or access denied", conv_id=conv_id, user_id=current_user.id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
 
-    # Fetch updated conversation
-    updated_conversation = await get_conversation_for_user(conv_id, current_user.id)
-
     logger.info("Conversation updated", conv_id=conv_id, user_id=current_user.id)
 
     return Conversation(**updated_conversation)
@@ -1,7 +1,10 @@
 """File upload API endpoints"""
 
+import stat
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import FileResponse
 from src.services.attachment import attachment_service
+from src.utils.temp_manager import temp_manager
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -28,12 +31,20 @@ async def upload_file(file: UploadFile = File(...)):
 async def get_file(file_id: str):
     """Get a temporary file by ID"""
 
-    from fastapi.responses import FileResponse
-    from src.utils.temp_manager import temp_manager
-
     file_path = temp_manager.get_temp_path(file_id)
 
-    if not file_path.exists():
+    # Stat once and hand the result to FileResponse so it does not stat again
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path)
+    # File IDs are unique per upload, so the content never changes
+    return FileResponse(
+        file_path,
+        stat_result=stat_result,
+        headers={"Cache-Control": "private, max-age=3600, immutable"}
+    )
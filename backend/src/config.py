@@ -1,6 +1,7 @@
 """Configuration management using pydantic-settings"""
 
-from typing import List
+from functools import cached_property
+from typing import FrozenSet, List
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -19,10 +20,17 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", description="Server host")
     port: int = Field(default=8000, description="Server port")
     debug: bool = Field(default=False, description="Debug mode")
+    log_level: str = Field(default="INFO", description="Minimum log level (DEBUG, INFO, WARNING, ERROR)")
+    cors_origins: str = Field(
+        default="http://localhost:3000,http://127.0.0.1:3000",
+        description="Comma-separated origins allowed to call the API (* allows any)"
+    )
+    cors_max_age: int = Field(default=86400, description="Seconds browsers may cache CORS preflight results")
 
     # Database
     mongodb_url: str = Field(default="mongodb://localhost:27017", description="MongoDB connection URL")
     database_name: str = Field(default="ai_chat_assistant", description="Database name")
+    redis_url: str = Field(default="", description="Redis connection URL (empty uses in-process storage)")
 
     # LLM API
     base_url: str = Field(default="https://dashscope.aliyuncs.com/compatible-mode/v1", description="OpenAI API base URL")
@@ -32,6 +40,20 @@ class Settings(BaseSettings):
     default_llm_provider: str = Field(default="openai", description="Default LLM provider")
     default_model: str = Field(default="qwen3-max", description="Default model name")
 
+    # Agent Routing
+    intent_cache_enabled: bool = Field(default=True, description="Cache intent recognition results per message")
+    intent_cache_size: int = Field(default=4096, description="Max cached intent results")
+    intent_cache_ttl: int = Field(default=3600, description="Intent cache TTL in seconds")
+    chat_history_max_turns: int = Field(default=10, description="Recent turns sent verbatim; older history is summarized")
+
+    # Password Hashing (Argon2id, RFC 9106 low-memory profile)
+    argon2_memory_cost: int = Field(default=19456, description="Argon2 memory cost in KiB")
+    argon2_time_cost: int = Field(default=2, description="Argon2 iterations")
+    argon2_parallelism: int = Field(default=1, description="Argon2 lanes per hash")
+    argon2_hash_len: int = Field(default=32, description="Argon2 digest length in bytes")
+    argon2_salt_len: int = Field(default=16, description="Argon2 salt length in bytes")
+    password_hash_memory_budget_mb: int = Field(default=256, description="RAM budget for concurrent password hashes; caps hashing threads")
+
     # File Upload
     max_upload_size: int = Field(default=10485760, description="Max upload size in bytes (10MB)")
     allowed_file_types: str = Field(
@@ -42,10 +64,15 @@ class Settings(BaseSettings):
     # Temp File Cleanup
     temp_file_cleanup_interval: int = Field(default=24, description="Cleanup interval in hours")
 
-    @property
-    def allowed_mime_types(self) -> List[str]:
-        """Parse allowed file types into a list"""
-        return [t.strip() for t in self.allowed_file_types.split(",")]
+    @cached_property
+    def cors_origin_list(self) -> List[str]:
+        """Parse allowed CORS origins into a list"""
+        return [o.strip() for o in self.cors_origins.split(",") if o.strip()]
+
+    @cached_property
+    def allowed_mime_set(self) -> FrozenSet[str]:
+        """Parse allowed file types once into a set for membership checks"""
+        return frozenset(t.strip() for t in self.allowed_file_types.split(",") if t.strip())
 
 
 # Global settings instance
@@ -1,10 +1,15 @@
 """Authentication utilities: JWT, password hashing, and captcha"""
 
+import asyncio
 import base64
 import io
+import os
 import random
+import secrets
 import string
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from uuid import uuid4
 
@@ -14,17 +19,66 @@ from captcha.image import ImageCaptcha
 from PIL import Image
 
 from src.config import settings
-
-
-# Password hashing context using Argon2
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from src.db.redis import redis_db
+from src.utils.cache import LRUCache
+from src.utils.clock import utc_now
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+# Password hashing context using Argon2; stored hashes with other parameters
+# are upgraded on next login via password_needs_rehash
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__rounds=settings.argon2_time_cost,
+    argon2__parallelism=settings.argon2_parallelism,
+    argon2__digest_size=settings.argon2_hash_len,
+    argon2__salt_size=settings.argon2_salt_len,
+)
+
+# Argon2 is CPU-bound and releases the GIL, so hashing runs off the event loop.
+# Each hash holds memory_cost KiB while it runs, so the pool is also capped by
+# the memory budget; excess logins queue instead of spiking RAM.
+PASSWORD_HASH_WORKERS = max(1, min(
+    os.cpu_count() or 1,
+    settings.password_hash_memory_budget_mb * 1024 // settings.argon2_memory_cost,
+))
+_pw_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Captcha rendering (PIL drawing and PNG encoding) is CPU-bound as well
+_captcha_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="captcha-render")
+
+# Verified against when a login names an unknown user, so that path costs the
+# same as a wrong password and does not reveal whether the username exists
+DUMMY_PASSWORD_HASH = pwd_context.hash("not-a-real-password-" + secrets.token_hex(16))
 
 # JWT configuration
 JWT_ALGORITHM = "HS256"
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Key bytes and algorithm list built once rather than on every encode/decode
+_JWT_KEY = settings.api_key.encode()
+_JWT_ALGORITHMS = [JWT_ALGORITHM]
+
+# Verified payloads by token; the short TTL bounds how long a decode is reused
+JWT_CACHE_TTL = 60
+_jwt_cache = LRUCache(maxsize=10000, ttl=JWT_CACHE_TTL)
+
+# Captcha configuration
+CAPTCHA_EXPIRE_SECONDS = 5 * 60
+CAPTCHA_KEY_PREFIX = "captcha:"
+CAPTCHA_LOCAL_MAX_ENTRIES = 10000
+# Captcha codes are security tokens, so they come from the OS CSPRNG
+_CAPTCHA_ALPHABET = string.ascii_uppercase + string.digits
+_CAPTCHA_RANDOM = random.SystemRandom()
+CAPTCHA_CODE_LENGTH = 4
+# Pre-rendered (code, image) pairs kept ready so requests skip rendering
+CAPTCHA_POOL_SIZE = 64
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
 
@@ -35,10 +89,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pw_executor, pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """
     Hash a password using Argon2.
 
@@ -48,7 +103,21 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password
     """
-    return pwd_context.hash(password)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pw_executor, pwd_context.hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash uses outdated parameters.
+
+    Args:
+        hashed_password: Hashed password from database
+
+    Returns:
+        True if the hash should be upgraded on next successful login
+    """
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -63,18 +132,19 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         Encoded JWT token string
     """
     to_encode = data.copy()
+    now = utc_now()
 
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({
         "exp": expire,
-        "iat": datetime.utcnow()
+        "iat": now
     })
 
-    encoded_jwt = jwt.encode(to_encode, settings.api_key, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
@@ -88,12 +158,22 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Decoded payload if valid, None otherwise
     """
-    try:
-        payload = jwt.decode(token, settings.api_key, algorithms=[JWT_ALGORITHM])
+    now = time.time()
+
+    payload = _jwt_cache.get(token)
+    if payload is not None and payload["exp"] > now:
         return payload
+
+    try:
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
     except jwt.PyJWTError:
         return None
 
+    # Never cache a payload past the token's own expiry
+    if "exp" in payload:
+        _jwt_cache.set(token, payload, ttl=min(JWT_CACHE_TTL, payload["exp"] - now))
+    return payload
+
 
 class CaptchaGenerator:
     """
@@ -111,40 +191,52 @@ class CaptchaGenerator:
         self.width = width
         self.height = height
         self.image_captcha = ImageCaptcha(width=width, height=height)
-        # Store captcha codes in memory (in production, use Redis)
-        self._storage: Dict[str, Dict[str, Any]] = {}
-
-    def generate_captcha(self) -> tuple[str, str]:
+        # Fallback storage when Redis is not configured (single worker only);
+        # entries expire lazily and the size bound caps memory under floods
+        self._storage = LRUCache(maxsize=CAPTCHA_LOCAL_MAX_ENTRIES, ttl=CAPTCHA_EXPIRE_SECONDS)
+        # Each pooled captcha is handed out once, then replaced by the refill task
+        self._pool: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=CAPTCHA_POOL_SIZE)
+        self._refill_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background task that keeps the pre-render pool full."""
+        if self._refill_task is None:
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        """Stop the pre-render task."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+    async def generate_captcha(self) -> tuple[str, str]:
         """
         Generate a new captcha image and code.
 
         Returns:
             Tuple of (captcha_id, base64_encoded_image)
         """
-        # Generate random 4-character code (uppercase letters and numbers)
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
+        try:
+            code, image_base64 = self._pool.get_nowait()
+        except asyncio.QueueEmpty:
+            # Pool drained (burst or not started): render on demand
+            code, image_base64 = await self._render_new()
         captcha_id = str(uuid4())
 
-        # Generate captcha image
-        image = self.image_captcha.generate_image(code)
-
-        # Convert to base64
-        buffer = io.BytesIO()
-        image.save(buffer, format='PNG')
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
         # Store captcha code with expiration (5 minutes)
-        self._storage[captcha_id] = {
-            'code': code,
-            'expires_at': datetime.utcnow() + timedelta(minutes=5)
-        }
-
-        # Clean up expired captchas
-        self._cleanup_expired()
+        redis = redis_db.get_client()
+        if redis is not None:
+            await redis.set(f"{CAPTCHA_KEY_PREFIX}{captcha_id}", code, ex=CAPTCHA_EXPIRE_SECONDS)
+        else:
+            self._storage.set(captcha_id, code)
 
         return captcha_id, f"data:image/png;base64,{image_base64}"
 
-    def verify_captcha(self, captcha_id: str, code: str) -> bool:
+    async def verify_captcha(self, captcha_id: str, code: str) -> bool:
         """
         Verify a captcha code.
 
@@ -155,34 +247,45 @@ class CaptchaGenerator:
         Returns:
             True if code matches and not expired, False otherwise
         """
-        if captcha_id not in self._storage:
+        # Fetch and remove in one step (one-time use)
+        redis = redis_db.get_client()
+        if redis is not None:
+            stored_code = await redis.getdel(f"{CAPTCHA_KEY_PREFIX}{captcha_id}")
+        else:
+            stored_code = self._storage.pop(captcha_id)
+
+        if stored_code is None:
             return False
 
-        stored_data = self._storage[captcha_id]
-
-        # Check expiration
-        if datetime.utcnow() > stored_data['expires_at']:
-            del self._storage[captcha_id]
-            return False
-
-        # Verify code (case-insensitive)
-        is_valid = stored_data['code'].upper() == code.upper()
-
-        # Remove captcha after verification (one-time use)
-        del self._storage[captcha_id]
+        # Verify code (case-insensitive, constant time)
+        return secrets.compare_digest(stored_code.upper().encode(), code.upper().encode())
+
+    async def _refill(self):
+        """Render captchas one at a time, blocking while the pool is full."""
+        while True:
+            try:
+                item = await self._render_new()
+            except Exception as e:
+                logger.error("Captcha pre-render failed", error=str(e))
+                await asyncio.sleep(1)
+                continue
+            await self._pool.put(item)
+
+    async def _render_new(self) -> tuple[str, str]:
+        """Pick a new code and render it off the event loop."""
+        # Generate random 4-character code (uppercase letters and numbers)
+        code = ''.join(_CAPTCHA_RANDOM.choices(_CAPTCHA_ALPHABET, k=CAPTCHA_CODE_LENGTH))
+        loop = asyncio.get_running_loop()
+        image_base64 = await loop.run_in_executor(_captcha_executor, self._render, code)
+        return code, image_base64
 
-        return is_valid
+    def _render(self, code: str) -> str:
+        """Render a captcha code to a base64-encoded PNG."""
+        image = self.image_captcha.generate_image(code)
 
-    def _cleanup_expired(self):
-        """Remove expired captchas from storage."""
-        now = datetime.utcnow()
-        expired_ids = [
-            captcha_id
-            for captcha_id, data in self._storage.items()
-            if now > data['expires_at']
-        ]
-        for captcha_id in expired_ids:
-            del self._storage[captcha_id]
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
 
 # Global captcha generator instance
@@ -10,6 +10,33 @@ from src.db.mongo import get_user_by_id, get_user_by_username
 security = HTTPBearer()
 
 
+async def _get_user(user_id: str) -> Optional[User]:
+    """Load a user by id (the lookup is cached in the db layer)"""
+    user_doc = await get_user_by_id(user_id)
+    return User(**user_doc) if user_doc is not None else None
+
+
+async def get_user_from_token(token: str) -> Optional[User]:
+    """
+    Resolve the user for a JWT (decode and user lookup are both cached).
+
+    Args:
+        token: JWT token string
+
+    Returns:
+        User object, or None if the token is invalid or the user does not exist
+    """
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    return await _get_user(user_id)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
@@ -31,38 +58,26 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Decode token
-    token = credentials.credentials
-    payload = decode_access_token(token)
-
-    if payload is None:
-        raise credentials_exception
-
-    # Extract user_id
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-
-    # Get user from database
-    user = await get_user_by_id(user_id)
+    # Decode token and load user (both cached)
+    user = await get_user_from_token(credentials.credentials)
     if user is None:
         raise credentials_exception
 
     # Check if user is banned
-    if user.get("is_banned", False):
+    if user.is_banned:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account has been banned"
         )
 
     # Check if user is active
-    if not user.get("is_active", True):
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive"
         )
 
-    return User(**user)
+    return user
 
 
 async def get_current_active_user(
@@ -126,21 +141,7 @@ async def get_optional_user(
     if credentials is None:
         return None
 
-    token = credentials.credentials
-    payload = decode_access_token(token)
-
-    if payload is None:
-        return None
-
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        return None
-
-    user = await get_user_by_id(user_id)
-    if user is None:
-        return None
-
-    return User(**user)
+    return await get_user_from_token(credentials.credentials)
 
 
 def user_to_response(user: User) -> UserResponse:
@@ -153,7 +154,8 @@ def user_to_response(user: User) -> UserResponse:
     Returns:
         UserResponse object
     """
-    return UserResponse(
+    # User is already validated, so build the response without re-validating
+    return UserResponse.model_construct(
         id=user.id,
         username=user.username,
         subscription_level=user.subscription_level,
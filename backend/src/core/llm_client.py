@@ -1,15 +1,19 @@
 """Unified LLM client supporting multiple providers"""
 
-import asyncio
-from typing import AsyncIterator, Optional, Dict, Any, List, Union
+import json
+from typing import AsyncIterator, Callable, Optional, Dict, Any, List
 from abc import ABC, abstractmethod
-from openai import AsyncOpenAI, AsyncStream
-from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI, AsyncStream, BadRequestError as OpenAIBadRequestError
+from anthropic import AsyncAnthropic, BadRequestError as AnthropicBadRequestError
 from src.config import settings
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Errors raised when a provider rejects a request as malformed (HTTP 400),
+# e.g. an OpenAI-compatible backend that does not accept response_format
+BAD_REQUEST_ERRORS = (OpenAIBadRequestError, AnthropicBadRequestError)
+
 
 class BaseLLMClient(ABC):
     """Base class for LLM clients"""
@@ -41,6 +45,16 @@ class OpenAIClient(BaseLLMClient):
     def __init__(self, api_key: str, base_url: Optional[str] = None):
         self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
 
+    @staticmethod
+    def _prepare_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop cache hints; OpenAI-compatible APIs cache stable prefixes automatically"""
+        if not any("cache_control" in msg for msg in messages):
+            return messages
+        return [
+            {k: v for k, v in msg.items() if k != "cache_control"}
+            for msg in messages
+        ]
+
     async def chat_completion_stream(
         self,
         messages: List[Dict[str, Any]],
@@ -50,14 +64,18 @@ class OpenAIClient(BaseLLMClient):
         """Get streaming chat completion from OpenAI"""
         response = await self.client.chat.completions.create(
             model=model,
-            messages=messages,
+            messages=self._prepare_messages(messages),
             stream=True,
             **kwargs
         )
 
         async for chunk in response:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+            # One attribute walk per token; usage-only chunks have no choices
+            choices = chunk.choices
+            if choices:
+                content = choices[0].delta.content
+                if content:
+                    yield content
 
     async def chat_completion(
         self,
@@ -68,7 +86,7 @@ class OpenAIClient(BaseLLMClient):
         """Get non-streaming chat completion from OpenAI"""
         response = await self.client.chat.completions.create(
             model=model,
-            messages=messages,
+            messages=self._prepare_messages(messages),
             stream=False,
             **kwargs
         )
@@ -81,23 +99,54 @@ class AnthropicClient(BaseLLMClient):
     def __init__(self, api_key: str):
         self.client = AsyncAnthropic(api_key=api_key)
 
-    async def chat_completion_stream(
-        self,
-        messages: List[Dict[str, Any]],
-        model: str,
-        **kwargs
-    ) -> AsyncIterator[str]:
-        """Get streaming chat completion from Anthropic"""
-        # Convert messages to Anthropic format
+    @staticmethod
+    def _convert_messages(messages: List[Dict[str, Any]]) -> tuple[str, List[Dict[str, Any]]]:
+        """Convert messages to Anthropic format (system prompt split out)"""
         system_message = ""
         user_messages = []
 
         for msg in messages:
             if msg["role"] == "system":
                 system_message = msg["content"]
+            elif "cache_control" in msg:
+                # Anthropic takes cache breakpoints on content blocks
+                user_messages.append({
+                    "role": msg["role"],
+                    "content": [{
+                        "type": "text",
+                        "text": msg["content"],
+                        "cache_control": msg["cache_control"]
+                    }]
+                })
             else:
                 user_messages.append(msg)
 
+        return system_message, user_messages
+
+    @staticmethod
+    def _structured_output_tool(response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Map an OpenAI-style json_schema response_format onto a forced tool definition"""
+        if not response_format or response_format.get("type") != "json_schema":
+            return None
+
+        json_schema = response_format["json_schema"]
+        return {
+            "name": json_schema["name"],
+            "description": json_schema.get("description", "Record the structured response"),
+            "input_schema": json_schema["schema"]
+        }
+
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Get streaming chat completion from Anthropic"""
+        # Structured output is only supported for non-streaming calls
+        kwargs.pop("response_format", None)
+        system_message, user_messages = self._convert_messages(messages)
+
         response = await self.client.messages.create(
             model=model,
             system=system_message,
@@ -118,15 +167,13 @@ class AnthropicClient(BaseLLMClient):
         **kwargs
     ) -> str:
         """Get non-streaming chat completion from Anthropic"""
-        # Convert messages to Anthropic format
-        system_message = ""
-        user_messages = []
+        system_message, user_messages = self._convert_messages(messages)
 
-        for msg in messages:
-            if msg["role"] == "system":
-                system_message = msg["content"]
-            else:
-                user_messages.append(msg)
+        # Anthropic has no response_format; forcing a tool call yields schema-shaped JSON
+        tool = self._structured_output_tool(kwargs.pop("response_format", None))
+        if tool:
+            kwargs["tools"] = [tool]
+            kwargs["tool_choice"] = {"type": "tool", "name": tool["name"]}
 
         response = await self.client.messages.create(
             model=model,
@@ -136,12 +183,25 @@ class AnthropicClient(BaseLLMClient):
             max_tokens=4096,
             **kwargs
         )
+
+        if tool:
+            for block in response.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input)
+
         return response.content[0].text
 
 
 class LLMClientFactory:
     """Factory for creating LLM clients"""
 
+    # Constructors by provider name; each client is built once and reused
+    _builders: Dict[str, Callable[[], BaseLLMClient]] = {
+        "openai": lambda: OpenAIClient(api_key=settings.openai_api_key),
+        "anthropic": lambda: AnthropicClient(api_key=settings.anthropic_api_key),
+        "qwen": lambda: OpenAIClient(api_key=settings.api_key, base_url=settings.base_url),
+    }
+
     _clients: Dict[str, BaseLLMClient] = {}
 
     @classmethod
@@ -149,35 +209,39 @@ class LLMClientFactory:
         """Get LLM client for provider"""
         provider = provider or settings.default_llm_provider
 
-        if provider in cls._clients:
-            return cls._clients[provider]
+        # Hot path: one dict lookup (construction never awaits, so there is
+        # no window for concurrent requests to build duplicates)
+        client = cls._clients.get(provider)
+        if client is not None:
+            return client
 
-        if provider == "openai":
-            client = OpenAIClient(api_key=settings.openai_api_key)
-        elif provider == "anthropic":
-            client = AnthropicClient(api_key=settings.anthropic_api_key)
-        elif provider == "qwen":
-            client = OpenAIClient(api_key=settings.api_key, base_url=settings.base_url)
-        else:
+        builder = cls._builders.get(provider)
+        if builder is None:
             raise ValueError(f"Unsupported LLM provider: {provider}")
 
-        cls._clients[provider] = client
+        client = cls._clients[provider] = builder()
         logger.info("LLM client initialized", provider=provider)
         return client
 
 
+def init_llm_clients():
+    """Build the default provider's client at startup so bad config fails fast"""
+    LLMClientFactory.get_client()
+
+
 async def get_llm_response(
     messages: List[Dict[str, Any]],
     model: str = None,
     provider: str = None,
+    **kwargs
 ) -> str:
-    """Get non-streaming LLM response"""
+    """Get non-streaming LLM response (extra options such as response_format are passed through)"""
     model = model or settings.default_model
     client = LLMClientFactory.get_client(provider)
 
     logger.info("LLM request", model=model, provider=provider, stream=False)
 
-    return await client.chat_completion(messages, model)
+    return await client.chat_completion(messages, model, **kwargs)
 
 
 async def get_llm_response_stream(
@@ -193,3 +257,4 @@ async def get_llm_response_stream(
 
     async for chunk in client.chat_completion_stream(messages, model):
         yield chunk
+
@@ -1,7 +1,7 @@
 """Streaming utilities for WebSocket and SSE"""
 
-import json
 import asyncio
+import orjson
 from typing import AsyncIterator, Any, Dict
 import structlog
 
@@ -23,8 +23,15 @@ class StreamChunk:
         self.metadata = metadata or {}
         self.error = error
 
-    def to_json(self) -> str:
-        """Convert chunk to JSON"""
+    def to_bytes(self) -> bytes:
+        """Convert chunk to UTF-8 encoded JSON"""
+        # Common token shape: only the content needs encoding
+        if not self.error and not self.metadata:
+            return b'{"content":%b,"done":%b,"metadata":{}}' % (
+                orjson.dumps(self.content),
+                b"true" if self.done else b"false",
+            )
+
         data = {
             "content": self.content,
             "done": self.done,
@@ -32,7 +39,12 @@ class StreamChunk:
         }
         if self.error:
             data["error"] = self.error
-        return json.dumps(data)
+        return orjson.dumps(data)
+
+    def to_json(self) -> str:
+        """Convert chunk to JSON"""
+        # Text frames: the frontend parses event.data with JSON.parse
+        return self.to_bytes().decode()
 
 
 async def stream_llm_response(
@@ -57,25 +69,42 @@ async def stream_llm_response(
         )
 
 
+# Marks the end of one producer in merge_streams
+_SENTINEL = object()
+
+# Items buffered per merge before producers are made to wait
+MERGE_QUEUE_SIZE = 64
+
+
 async def merge_streams(*streams: AsyncIterator[Any]) -> AsyncIterator[Any]:
     """Merge multiple async iterators into one"""
-    queue = asyncio.Queue()
+    # Bounded so a fast producer waits for the consumer instead of buffering
+    queue = asyncio.Queue(maxsize=MERGE_QUEUE_SIZE)
 
     async def producer(stream: AsyncIterator[Any]):
-        async for item in stream:
-            await queue.put(item)
+        try:
+            async for item in stream:
+                await queue.put(item)
+        except Exception as e:
+            logger.error("Merged stream failed", error=str(e))
+        finally:
+            # On cancellation the consumer is gone, and a put into a full
+            # queue would never return
+            if not asyncio.current_task().cancelling():
+                await queue.put(_SENTINEL)
 
     # Start all producers
     tasks = [asyncio.create_task(producer(stream)) for stream in streams]
+    remaining = len(tasks)
 
-    # Yield items from queue
+    # Yield items until every producer has signalled completion
     try:
-        while any(not t.done() for t in tasks):
-            try:
-                item = await asyncio.wait_for(queue.get(), timeout=0.1)
-                yield item
-            except asyncio.TimeoutError:
+        while remaining:
+            item = await queue.get()
+            if item is _SENTINEL:
+                remaining -= 1
                 continue
+            yield item
     finally:
         for task in tasks:
             task.cancel()
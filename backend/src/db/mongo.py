@@ -1,14 +1,78 @@
 """MongoDB database connection and operations"""
 
+import asyncio
+import itertools
+import math
+import re
+import weakref
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional, Dict, Any
+from pymongo import ReturnDocument
+from typing import Optional, Dict, Any, List
 from uuid import uuid4
 from datetime import datetime
 from src.config import settings
+from src.utils.cache import LRUCache
+from src.utils.clock import utc_now
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Fields returned by user listings and admin updates. Must match UserResponse
+# exactly: admin endpoints build responses with UserResponse.model_construct.
+USER_RESPONSE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "username": 1,
+    "subscription_level": 1,
+    "role": 1,
+    "is_active": 1,
+    "is_banned": 1,
+    "created_at": 1,
+}
+
+
+# Cache generations, unique across the process. A cache holds each user's
+# current generation as a ("gen", user_id) entry with no expiry; reading it
+# keeps it more recent than every entry keyed with an older generation, so LRU
+# eviction drops those first and the generation's memory stays bounded by the
+# cache. Numbers are never reused, so a generation that falls back to 0 after
+# eviction cannot make an older entry reachable again.
+_generation_counter = itertools.count(1)
+
+
+def _get_generation(cache: LRUCache, user_id: str) -> int:
+    """Current cache generation for a user (0 if never bumped or evicted)"""
+    return cache.get(("gen", user_id), 0)
+
+
+def _bump_generation(cache: LRUCache, user_id: str):
+    """Make every cached entry keyed with a user's current generation unreachable"""
+    cache.set(("gen", user_id), next(_generation_counter), ttl=math.inf)
+
+
+# Users by id, read on every authenticated request. Keys embed a per-user
+# generation that user writes bump, so an admin ban takes effect immediately on
+# this worker; the short TTL bounds staleness on other workers. Cached
+# documents are shared: callers must not mutate them.
+USER_CACHE_TTL = 30
+_user_cache = LRUCache(maxsize=50000, ttl=USER_CACHE_TTL)
+# One lock per user id while a lookup is in flight, to avoid a thundering herd
+_user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _invalidate_user(user_id: str):
+    """Make the cached document for a user unreachable"""
+    _bump_generation(_user_cache, user_id)
+
+
+# User documents for lookups by id (auth and admin); the password hash is only
+# read by login, which looks users up by username
+USER_LEAN_PROJECTION = {"_id": 0, "password_hash": 0}
+
+
+# Conversation listings match the Conversation response model (no _id / owner)
+CONVERSATION_LIST_PROJECTION = {"_id": 0, "user_id": 0}
+
 
 class MongoDB:
     """MongoDB connection manager"""
@@ -62,9 +126,16 @@ async def init_db():
     await db.conversations.create_index("created_at")
     await db.conversations.create_index("updated_at")
     await db.conversations.create_index("title")
-    await db.conversations.create_index("user_id")
+    # Owner-scoped lookups ({"id", "user_id"}) and per-user listings by recency
+    await db.conversations.create_index([("id", 1), ("user_id", 1)], unique=True)
+    await db.conversations.create_index([("user_id", 1), ("updated_at", -1)])
+    # The standalone user_id index is a prefix of the one above; drop it from
+    # existing deployments so writes stop maintaining it
+    if "user_id_1" in await db.conversations.index_information():
+        await db.conversations.drop_index("user_id_1")
 
     # Create indexes for users
+    await db.users.create_index("id", unique=True)
     await db.users.create_index("username", unique=True)
     await db.users.create_index("email", unique=True, sparse=True)
     await db.users.create_index("created_at")
@@ -94,6 +165,7 @@ async def create_user(
     """
     db = mongodb.get_db()
     user_id = str(uuid4())
+    now = utc_now()
 
     user_doc = {
         "id": user_id,
@@ -103,8 +175,8 @@ async def create_user(
         "role": role,
         "is_active": True,
         "is_banned": False,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "created_at": now,
+        "updated_at": now,
         "last_login": None
     }
 
@@ -115,7 +187,7 @@ async def create_user(
 
 async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """
-    Get user by ID.
+    Get user by ID (cached, without password_hash).
 
     Args:
         user_id: User UUID
@@ -123,8 +195,27 @@ async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         User document or None
     """
-    db = mongodb.get_db()
-    return await db.users.find_one({"id": user_id})
+    cache_key = (user_id, _get_generation(_user_cache, user_id))
+    user = _user_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _user_locks[user_id] = lock
+
+    async with lock:
+        # Another request may have populated the cache while we waited
+        user = _user_cache.get(cache_key)
+        if user is not None:
+            return user
+
+        db = mongodb.get_db()
+        user = await db.users.find_one({"id": user_id}, projection=USER_LEAN_PROJECTION)
+        if user is not None:
+            _user_cache.set(cache_key, user)
+        return user
 
 
 async def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
@@ -138,7 +229,7 @@ async def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
         User document or None
     """
     db = mongodb.get_db()
-    return await db.users.find_one({"username": username})
+    return await db.users.find_one({"username": username}, projection={"_id": 0})
 
 
 async def update_user_last_login(user_id: str) -> None:
@@ -151,8 +242,9 @@ async def update_user_last_login(user_id: str) -> None:
     db = mongodb.get_db()
     await db.users.update_one(
         {"id": user_id},
-        {"$set": {"last_login": datetime.utcnow()}}
+        {"$set": {"last_login": utc_now()}}
     )
+    _invalidate_user(user_id)
 
 
 async def list_users(
@@ -166,28 +258,28 @@ async def list_users(
     Args:
         skip: Number of users to skip
         limit: Maximum number of users to return
-        search: Search string for username
+        search: Username substring to search for (case-insensitive)
 
     Returns:
         Tuple of (user list, total count)
     """
     db = mongodb.get_db()
 
-    # Build query
+    # Build query (escaped substring match on username)
     query = {}
     if search:
-        query["username"] = {"$regex": search, "$options": "i"}
-
-    # Get total count
-    total = await db.users.count_documents(query)
+        query["username"] = {"$regex": re.escape(search), "$options": "i"}
 
-    # Get users with pagination
-    cursor = db.users.find(query).skip(skip).limit(limit).sort("created_at", -1)
-    users = await cursor.to_list(length=limit)
+    # Count and fetch the page concurrently, projecting only response fields
+    cursor = db.users.find(
+        query,
+        projection=USER_RESPONSE_PROJECTION
+    ).skip(skip).limit(limit).sort("created_at", -1)
 
-    # Remove password hash from results
-    for user in users:
-        user.pop("password_hash", None)
+    users, total = await asyncio.gather(
+        cursor.to_list(length=limit),
+        db.users.count_documents(query)
+    )
 
     return users, total
 
@@ -201,22 +293,25 @@ async def update_user(user_id: str, updates: Dict[str, Any]) -> Optional[Dict[st
         updates: Fields to update
 
     Returns:
-        Updated user document or None
+        Updated user document (UserResponse fields) or None if not found
     """
     db = mongodb.get_db()
-    updates["updated_at"] = datetime.utcnow()
 
-    result = await db.users.update_one(
+    # Nothing to change: answer the existence check without a write
+    if not updates:
+        return await db.users.find_one({"id": user_id}, projection=USER_RESPONSE_PROJECTION)
+
+    user = await db.users.find_one_and_update(
         {"id": user_id},
-        {"$set": updates}
+        {"$set": {**updates, "updated_at": utc_now()}},
+        projection=USER_RESPONSE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
+    _invalidate_user(user_id)
+    return user
 
-    if result.modified_count > 0:
-        return await get_user_by_id(user_id)
-    return None
 
-
-async def ban_user(user_id: str) -> bool:
+async def ban_user(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Ban a user.
 
@@ -224,17 +319,12 @@ async def ban_user(user_id: str) -> bool:
         user_id: User UUID
 
     Returns:
-        True if successful
+        Updated user document or None if not found
     """
-    db = mongodb.get_db()
-    result = await db.users.update_one(
-        {"id": user_id},
-        {"$set": {"is_banned": True, "updated_at": datetime.utcnow()}}
-    )
-    return result.modified_count > 0
+    return await update_user(user_id, {"is_banned": True})
 
 
-async def unban_user(user_id: str) -> bool:
+async def unban_user(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Unban a user.
 
@@ -242,18 +332,36 @@ async def unban_user(user_id: str) -> bool:
         user_id: User UUID
 
     Returns:
-        True if successful
+        Updated user document or None if not found
     """
-    db = mongodb.get_db()
-    result = await db.users.update_one(
-        {"id": user_id},
-        {"$set": {"is_banned": False, "updated_at": datetime.utcnow()}}
-    )
-    return result.modified_count > 0
+    return await update_user(user_id, {"is_banned": False})
 
 
 # ==================== Conversation Operations (with user_id) ====================
 
+# Short-lived cache for conversation reads that the frontend repeats in bursts.
+# Keys embed a per-user generation that every conversation write bumps, so a
+# write makes all of that user's cached reads unreachable at once. Cached
+# documents are shared: callers must not mutate them.
+CONVERSATION_CACHE_TTL = 3
+_conversation_cache = LRUCache(maxsize=4096, ttl=CONVERSATION_CACHE_TTL)
+
+
+def _conversation_generation(user_id: str) -> int:
+    """Current cache generation for a user's conversations"""
+    return _get_generation(_conversation_cache, user_id)
+
+
+def _invalidate_conversations(user_id: str):
+    """Invalidate every cached conversation read for a user"""
+    _bump_generation(_conversation_cache, user_id)
+
+
+def _conversation_filter(conv_id: str, user_id: str) -> Dict[str, str]:
+    """Owner-scoped filter for a single conversation (served by the (id, user_id) index)"""
+    return {"id": conv_id, "user_id": user_id}
+
+
 async def create_conversation(
     user_id: str,
     title: str = "New Conversation"
@@ -270,18 +378,20 @@ async def create_conversation(
     """
     db = mongodb.get_db()
     conv_id = str(uuid4())
+    now = utc_now()
 
     conv_doc = {
         "id": conv_id,
         "user_id": user_id,
         "title": title,
         "messages": [],
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "created_at": now,
+        "updated_at": now,
         "metadata": {}
     }
 
     await db.conversations.insert_one(conv_doc)
+    _invalidate_conversations(user_id)
     return conv_doc
 
 
@@ -301,13 +411,21 @@ async def get_user_conversations(
     Returns:
         List of conversation documents
     """
+    cache_key = ("list", user_id, _conversation_generation(user_id), skip, limit)
+    cached = _conversation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     db = mongodb.get_db()
 
     cursor = db.conversations.find(
-        {"user_id": user_id}
+        {"user_id": user_id},
+        projection=CONVERSATION_LIST_PROJECTION
     ).skip(skip).limit(limit).sort("updated_at", -1)
 
-    return await cursor.to_list(length=limit)
+    conversations = await cursor.to_list(length=limit)
+    _conversation_cache.set(cache_key, conversations)
+    return conversations
 
 
 async def get_conversation_for_user(
@@ -324,52 +442,149 @@ async def get_conversation_for_user(
     Returns:
         Conversation document or None
     """
+    cache_key = ("get", user_id, _conversation_generation(user_id), conv_id)
+    cached = _conversation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     db = mongodb.get_db()
-    return await db.conversations.find_one({"id": conv_id, "user_id": user_id})
+    conversation = await db.conversations.find_one(_conversation_filter(conv_id, user_id), {"_id": 0})
+    if conversation is not None:
+        _conversation_cache.set(cache_key, conversation)
+    return conversation
 
 
-async def add_message_to_conversation(
+async def get_conversation_tail(
     conv_id: str,
     user_id: str,
-    role: str,
-    content: str,
-    attachments: list = None
+    n: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a conversation's id, title and last N messages (with user ownership check).
+
+    Uncached: the chat handlers extend the returned history in place.
+
+    Args:
+        conv_id: Conversation UUID
+        user_id: User UUID
+        n: Number of most recent messages to return
+
+    Returns:
+        Trimmed conversation document (with message_count, the total number of
+        messages stored) or None
+    """
+    db = mongodb.get_db()
+
+    projection = {
+        "_id": 0,
+        "id": 1,
+        "user_id": 1,
+        "title": 1,
+        "messages": {"$slice": -n},
+        "message_count": {"$size": {"$ifNull": ["$messages", []]}}
+    }
+
+    return await db.conversations.find_one(_conversation_filter(conv_id, user_id), projection)
+
+
+async def update_conversation_for_user(
+    conv_id: str,
+    user_id: str,
+    updates: Dict[str, Any]
 ) -> Optional[Dict[str, Any]]:
     """
-    Add a message to a conversation (with user ownership check).
+    Update conversation fields (with user ownership check).
 
     Args:
         conv_id: Conversation UUID
         user_id: User UUID
-        role: Message role (user, assistant, system)
-        content: Message content
-        attachments: List of attachment IDs
+        updates: Fields to set
 
     Returns:
-        Updated conversation document or None
+        Updated conversation document or None if not found
     """
     db = mongodb.get_db()
 
-    from datetime import datetime
-    from uuid import uuid4
+    conversation = await db.conversations.find_one_and_update(
+        _conversation_filter(conv_id, user_id),
+        {"$set": {**updates, "updated_at": utc_now()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    _invalidate_conversations(user_id)
+    return conversation
+
+
+async def delete_conversation_for_user(conv_id: str, user_id: str) -> bool:
+    """
+    Delete a conversation (with user ownership check).
+
+    Args:
+        conv_id: Conversation UUID
+        user_id: User UUID
 
-    message = {
-        "id": str(uuid4()),
+    Returns:
+        True if a conversation was deleted
+    """
+    db = mongodb.get_db()
+    result = await db.conversations.delete_one(_conversation_filter(conv_id, user_id))
+    _invalidate_conversations(user_id)
+    return result.deleted_count > 0
+
+
+def _new_message(
+    role: str,
+    content: str,
+    attachments: list = None,
+    message_id: str = None,
+    timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Build a message document for a conversation's messages array"""
+    return {
+        "id": message_id or uuid4().hex,
         "role": role,
         "content": content,
         "attachments": attachments or [],
         "metadata": {},
-        "timestamp": datetime.utcnow()
+        "timestamp": timestamp or utc_now()
     }
 
+
+async def add_messages_batch(
+    conv_id: str,
+    user_id: str,
+    messages: List[Dict[str, Any]],
+    now: Optional[datetime] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Append several messages to a conversation in one write (with user ownership check).
+
+    Args:
+        conv_id: Conversation UUID
+        user_id: User UUID
+        messages: Dicts with role, content and optional attachments / id
+        now: Timestamp for the messages and updated_at (defaults to the current time)
+
+    Returns:
+        The stored message documents, or None if the conversation was not found
+    """
+    db = mongodb.get_db()
+    now = now or utc_now()
+
+    docs = [
+        _new_message(msg["role"], msg["content"], msg.get("attachments"), msg.get("id"), now)
+        for msg in messages
+    ]
+
     result = await db.conversations.update_one(
-        {"id": conv_id, "user_id": user_id},
+        _conversation_filter(conv_id, user_id),
         {
-            "$push": {"messages": message},
-            "$set": {"updated_at": datetime.utcnow()}
+            "$push": {"messages": {"$each": docs}},
+            "$set": {"updated_at": now}
         }
     )
+    _invalidate_conversations(user_id)
 
-    if result.modified_count > 0:
-        return await get_conversation_for_user(conv_id, user_id)
+    if result.matched_count > 0:
+        return docs
     return None
@@ -0,0 +1,48 @@
+"""Redis connection for shared, expiring state"""
+
+from typing import Optional
+import redis.asyncio as aioredis
+from src.config import settings
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class RedisDB:
+    """Redis connection manager"""
+
+    def __init__(self):
+        self.client: Optional[aioredis.Redis] = None
+
+    async def connect(self):
+        """Connect to Redis (skipped when no URL is configured)"""
+        if not settings.redis_url:
+            logger.info("Redis not configured, using in-process storage")
+            return
+
+        try:
+            self.client = aioredis.from_url(settings.redis_url, decode_responses=True)
+
+            # Test connection
+            await self.client.ping()
+
+            logger.info("Connected to Redis")
+
+        except Exception as e:
+            logger.error("Failed to connect to Redis", error=str(e))
+            raise
+
+    async def disconnect(self):
+        """Disconnect from Redis"""
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+            logger.info("Disconnected from Redis")
+
+    def get_client(self) -> Optional[aioredis.Redis]:
+        """Get Redis client, or None when Redis is not configured"""
+        return self.client
+
+
+# Global Redis instance
+redis_db = RedisDB()
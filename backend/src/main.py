@@ -1,14 +1,21 @@
 """FastAPI application entry point"""
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from src.config import settings
 from src.db.mongo import mongodb, init_db
+from src.db.redis import redis_db
+from src.core.llm_client import init_llm_clients
+from src.core.auth import captcha_generator
 from src.api import chat, conversations, upload, auth, admin
 from src.agents import agent_registry
 from src.utils.logger import configure_logging
+from src.utils.temp_manager import temp_manager
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -25,15 +32,29 @@ async def lifespan(app: FastAPI):
     # Connect to database
     await mongodb.connect()
     await init_db()
+    await redis_db.connect()
 
-    # List registered agents
+    # Create the LLM client (and its connection pool) before the first request
+    init_llm_clients()
+
+    # Keep pre-rendered captchas ready off the request path
+    captcha_generator.start()
+
+    # Remove expired uploads in the background
+    temp_manager.start()
+
+    # List registered agents and pre-build the /api/agents response
     agents = agent_registry.list_agents()
     logger.info("Registered agents", count=len(agents), agents=[a.name for a in agents])
+    _get_agents_payload()
 
     yield
 
     # Shutdown
     logger.info("Shutting down AI Chat Assistant")
+    await captcha_generator.stop()
+    await temp_manager.stop()
+    await redis_db.disconnect()
     await mongodb.disconnect()
 
 
@@ -42,16 +63,19 @@ app = FastAPI(
     title="AI Chat Assistant",
     description="Full-stack AI chat assistant with agent routing",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson for every JSON response, including the included routers'
+    default_response_class=ORJSONResponse
 )
 
-# Configure CORS
+# Configure CORS (auth uses bearer tokens, not cookies, so no credentials mode)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
+    allow_origins=settings.cors_origin_list,
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=settings.cors_max_age,
 )
 
 # Include routers
@@ -62,17 +86,44 @@ app.include_router(conversations.router)
 app.include_router(upload.router)
 
 
+# Static response bodies, serialized once. A fresh Response is built per
+# request: middleware appends headers to a response's header list, so a shared
+# instance would accumulate them.
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "version": "1.0.0"})
+_ROOT_BODY = orjson.dumps({
+    "message": "AI Chat Assistant API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "health": "/health"
+})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "1.0.0"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
+# Serialized /api/agents body and the agent tuple it was built from; the
+# registry returns the same tuple until an agent is registered
+_agents_payload: Optional[bytes] = None
+_agents_payload_source: Optional[tuple] = None
+
+
+def _get_agents_payload() -> bytes:
+    """Serialize the agent list once per registry change"""
+    global _agents_payload, _agents_payload_source
+    agents = agent_registry.list_agents()
+    if agents is not _agents_payload_source:
+        _agents_payload = orjson.dumps({"agents": [a.model_dump() for a in agents]})
+        _agents_payload_source = agents
+    return _agents_payload
 
 
 @app.get("/api/agents")
 async def list_agents():
     """List all available agents"""
-    agents = agent_registry.list_agents()
-    return {"agents": [a.model_dump() for a in agents]}
+    return Response(content=_get_agents_payload(), media_type="application/json")
 
 
 # Mount frontend static files (if built)
@@ -82,12 +133,7 @@ async def list_agents():
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "AI Chat Assistant API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "health": "/health"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -97,5 +143,6 @@ if __name__ == "__main__":
         "src.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        ws_max_size=chat.MAX_WS_MESSAGE_SIZE
     )
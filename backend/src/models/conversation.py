@@ -2,28 +2,30 @@
 
 from datetime import datetime
 from typing import Optional, List, Literal, Dict, Any
-from pydantic import BaseModel, Field
+from uuid import uuid4
+from pydantic import BaseModel, ConfigDict, Field
+from src.utils.clock import utc_now
 
 
 class Message(BaseModel):
     """Chat message model"""
 
-    id: str = Field(default_factory=lambda: str(datetime.utcnow().timestamp()))
+    id: str = Field(default_factory=lambda: uuid4().hex)
     role: Literal["user", "assistant", "system"] = Field(description="Message role")
     content: str = Field(default="", description="Message content (text or markdown)")
     attachments: List[str] = Field(default_factory=list, description="List of attachment file IDs")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
 
 
 class Conversation(BaseModel):
     """Conversation model"""
 
-    id: str = Field(default_factory=lambda: str(datetime.utcnow().timestamp()))
+    id: str = Field(default_factory=lambda: uuid4().hex)
     title: str = Field(default="New Conversation", description="Conversation title")
     messages: List[Message] = Field(default_factory=list, description="Message history")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -77,6 +79,8 @@ class AgentInfo(BaseModel):
 class IntentResult(BaseModel):
     """Intent recognition result"""
 
+    model_config = ConfigDict(extra="ignore")
+
     intent: str = Field(..., description="Recognized intent")
     confidence: float = Field(default=0.0, description="Confidence score")
     agent: Optional[str] = Field(default=None, description="Target agent name")
@@ -3,28 +3,45 @@
 from datetime import datetime
 from typing import Optional, Literal
 from pydantic import BaseModel, Field, field_validator
+from src.utils.clock import utc_now
 import re
 
 
+# Validation patterns, compiled once at import
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+_USERNAME_DANGEROUS_RE = re.compile(r'[<>"\'&${}()]')
+_PASSWORD_DANGEROUS_RE = re.compile(r'[<>"\'&]')
+_UPPERCASE_RE = re.compile(r'[A-Z]')
+_LOWERCASE_RE = re.compile(r'[a-z]')
+_DIGIT_RE = re.compile(r'[0-9]')
+_CAPTCHA_RE = re.compile(r'^[A-Z0-9]+$')
+# Whole-password check for the common valid case: one upper, lower and digit,
+# no dangerous characters. Failures fall back to the per-rule checks for the
+# specific error message.
+_PASSWORD_OK_RE = re.compile(r'(?s)(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9])[^<>"\'&]*')
+
+
 class SubscriptionLevel:
     """Subscription level constants"""
     FREE = "free"
     GOLD = "gold"
     DIAMOND = "diamond"
+    ALL = (FREE, GOLD, DIAMOND)
 
     @classmethod
     def all(cls):
-        return [cls.FREE, cls.GOLD, cls.DIAMOND]
+        return cls.ALL
 
 
 class UserRole:
     """User role constants"""
     USER = "user"
     ADMIN = "admin"
+    ALL = (USER, ADMIN)
 
     @classmethod
     def all(cls):
-        return [cls.USER, cls.ADMIN]
+        return cls.ALL
 
 
 class User(BaseModel):
@@ -32,7 +49,10 @@ class User(BaseModel):
 
     id: str = Field(description="User UUID")
     username: str = Field(description="Username (unique)")
-    password_hash: str = Field(description="Argon2 hashed password")
+    password_hash: Optional[str] = Field(
+        default=None,
+        description="Argon2 hashed password (omitted by lookups that do not verify passwords)"
+    )
     subscription_level: Literal["free", "gold", "diamond"] = Field(
         default=SubscriptionLevel.FREE,
         description="Subscription level"
@@ -43,8 +63,8 @@ class User(BaseModel):
     )
     is_active: bool = Field(default=True, description="Account active status")
     is_banned: bool = Field(default=False, description="Account banned status")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     last_login: Optional[datetime] = Field(default=None, description="Last login timestamp")
 
 
@@ -70,29 +90,27 @@ class UserCreate(BaseModel):
     @classmethod
     def validate_username(cls, v: str) -> str:
         """Validate username format (alphanumeric and underscore only, no special characters)"""
-        if not re.match(r'^[a-zA-Z0-9_]+$', v):
+        # A full match on the allowed set also rules out XSS/NoSQL injection characters
+        if not _USERNAME_RE.fullmatch(v):
             raise ValueError(
                 'Username can only contain letters, numbers, and underscores'
             )
-        # Check for XSS/NoSQL injection patterns
-        dangerous_patterns = ['<', '>', '"', "'", '&', '$', '{', '}', '(', ')']
-        if any(pattern in v for pattern in dangerous_patterns):
-            raise ValueError('Username contains invalid characters')
         return v
 
     @field_validator('password')
     @classmethod
     def validate_password(cls, v: str) -> str:
         """Validate password complexity"""
-        if not re.search(r'[A-Z]', v):
+        if _PASSWORD_OK_RE.fullmatch(v):
+            return v
+        if not _UPPERCASE_RE.search(v):
             raise ValueError('Password must contain at least one uppercase letter')
-        if not re.search(r'[a-z]', v):
+        if not _LOWERCASE_RE.search(v):
             raise ValueError('Password must contain at least one lowercase letter')
-        if not re.search(r'[0-9]', v):
+        if not _DIGIT_RE.search(v):
             raise ValueError('Password must contain at least one number')
         # Check for dangerous characters
-        dangerous_patterns = ['<', '>', '"', "'", '&']
-        if any(pattern in v for pattern in dangerous_patterns):
+        if _PASSWORD_DANGEROUS_RE.search(v):
             raise ValueError('Password contains invalid characters')
         return v
 
@@ -103,7 +121,7 @@ class UserCreate(BaseModel):
         # Allow empty string (captcha disabled)
         if v == '':
             return v
-        if not re.match(r'^[A-Z0-9]+$', v.upper()):
+        if not _CAPTCHA_RE.match(v.upper()):
             raise ValueError('Invalid captcha format')
         return v.upper()
 
@@ -120,8 +138,7 @@ class UserLogin(BaseModel):
     @classmethod
     def validate_username(cls, v: str) -> str:
         """Validate and sanitize username"""
-        dangerous_patterns = ['<', '>', '"', "'", '&', '$', '{', '}', '(', ')']
-        if any(pattern in v for pattern in dangerous_patterns):
+        if _USERNAME_DANGEROUS_RE.search(v):
             raise ValueError('Username contains invalid characters')
         return v
 
@@ -132,7 +149,7 @@ class UserLogin(BaseModel):
         # Allow empty string (captcha disabled)
         if v == '':
             return v
-        if not re.match(r'^[A-Z0-9]+$', v.upper()):
+        if not _CAPTCHA_RE.match(v.upper()):
             raise ValueError('Invalid captcha format')
         return v.upper()
 
@@ -16,31 +16,29 @@ class AttachmentService:
     async def upload_file(self, file: UploadFile) -> dict:
         """Upload a file to temp directory"""
 
-        # Validate file size
-        content = await file.read()
-
-        if len(content) > settings.max_upload_size:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size: {settings.max_upload_size} bytes"
-            )
-
-        # Validate file type
-        if file.content_type not in settings.allowed_mime_types:
+        # Validate file type before reading anything
+        if file.content_type not in settings.allowed_mime_set:
             raise HTTPException(
                 status_code=415,
                 detail=f"Unsupported file type: {file.content_type}"
             )
 
-        # Generate file ID and save
+        # Reject before writing anything when the declared size is already too big
+        if file.size is not None and file.size > settings.max_upload_size:
+            self._raise_too_large()
+
+        # Stream to disk in chunks, enforcing the size limit as we go
         file_id = temp_manager.generate_file_id(file.filename)
-        await temp_manager.save_file(file_id, content)
+        size = await temp_manager.save_upload(file_id, file, settings.max_upload_size)
+
+        if size is None:
+            self._raise_too_large()
 
         logger.info(
             "File uploaded",
             file_id=file_id,
             filename=file.filename,
-            size=len(content),
+            size=size,
             mime_type=file.content_type
         )
 
@@ -48,10 +46,18 @@ class AttachmentService:
             "file_id": file_id,
             "filename": file.filename,
             "mime_type": file.content_type,
-            "size": len(content),
+            "size": size,
             "temp_path": str(temp_manager.get_temp_path(file_id))
         }
 
+    @staticmethod
+    def _raise_too_large():
+        """Reject an upload over the configured size limit"""
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {settings.max_upload_size} bytes"
+        )
+
     async def cleanup_files(self, file_ids: List[str]):
         """Clean up temporary files after processing"""
 
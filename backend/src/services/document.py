@@ -1,20 +1,73 @@
 """Document processing service for PDF, Excel, and other file types"""
 
+import asyncio
+import csv
 import io
-import pandas as pd
 import PyPDF2
 import pdfplumber
+import aiofiles
 from pathlib import Path
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+from python_calamine import CalamineWorkbook
 from src.utils.temp_manager import temp_manager
 import structlog
 
 logger = structlog.get_logger(__name__)
 
 
+def _markdown_cell(value: Any) -> str:
+    """Render one cell for a Markdown table"""
+    if value is None:
+        return ""
+    # Spreadsheet readers return whole numbers as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def markdown_table(rows: Iterable[Sequence[Any]]) -> str:
+    """
+    Render rows as a Markdown table, using the first row as the header.
+
+    Args:
+        rows: Table rows (the first one is the header)
+
+    Returns:
+        Markdown table, or an empty string if there are no rows
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return ""
+
+    width = len(header)
+    lines = [
+        "| " + " | ".join(map(_markdown_cell, header)) + " |",
+        "|" + " --- |" * width,
+    ]
+    for row in rows:
+        cells = list(map(_markdown_cell, row[:width]))
+        cells.extend([""] * (width - len(cells)))
+        lines.append("| " + " | ".join(cells) + " |")
+
+    return "\n".join(lines)
+
+
 class DocumentService:
     """Service for processing various document types"""
 
+    def __init__(self):
+        # Handler per lowercase file extension
+        self._handlers: Dict[str, Callable[[Path], Awaitable[str]]] = {
+            ".pdf": self._process_pdf,
+            ".xlsx": self._process_excel,
+            ".xls": self._process_excel,
+            ".csv": self._process_csv,
+            ".txt": self._process_text,
+            ".md": self._process_text,
+            ".json": self._process_text,
+        }
+
     async def process_file(self, file_id: str) -> str:
         """Process a file and return its text content"""
 
@@ -25,17 +78,12 @@ class DocumentService:
 
         file_ext = file_path.suffix.lower()
 
+        handler = self._handlers.get(file_ext)
+        if handler is None:
+            return f"[Unsupported file type: {file_ext}. Only text content available.]"
+
         try:
-            if file_ext == ".pdf":
-                return await self._process_pdf(file_path)
-            elif file_ext in [".xlsx", ".xls"]:
-                return await self._process_excel(file_path)
-            elif file_ext == ".csv":
-                return await self._process_csv(file_path)
-            elif file_ext in [".txt", ".md", ".json"]:
-                return await self._process_text(file_path)
-            else:
-                return f"[Unsupported file type: {file_ext}. Only text content available.]"
+            return await handler(file_path)
 
         except Exception as e:
             logger.error("Document processing failed", file_id=file_id, error=str(e))
@@ -44,40 +92,62 @@ class DocumentService:
     async def _process_pdf(self, file_path: Path) -> str:
         """Extract text from PDF"""
 
-        content = []
+        # Parsing is blocking and CPU-bound, so keep it off the event loop
+        return await asyncio.to_thread(self._extract_pdf, file_path)
+
+    @staticmethod
+    def _extract_pdf(file_path: Path) -> str:
+        """Extract text from PDF (blocking; runs in a worker thread)"""
+
+        # Pages are written straight into one buffer ("\n\n" between pages)
+        # instead of being collected in a list and joined
+        content = io.StringIO()
 
         # Try pdfplumber first (better for tables)
         try:
             with pdfplumber.open(file_path) as pdf:
                 for page_num, page in enumerate(pdf.pages):
                     text = page.extract_text()
+                    # Release the page's parsed layout objects before the next one
+                    page.close()
                     if text:
-                        content.append(f"--- Page {page_num + 1} ---\n{text}")
+                        if content.tell():
+                            content.write("\n\n")
+                        content.write(f"--- Page {page_num + 1} ---\n{text}")
         except Exception as e:
             logger.warning("pdfplumber failed, trying PyPDF2", error=str(e))
 
-            # Fallback to PyPDF2
-            with open(file_path, "rb") as f:
-                pdf_reader = PyPDF2.PdfReader(f)
+            # Fallback to PyPDF2 (drop any pages pdfplumber got through)
+            content = io.StringIO()
+            with temp_manager.mmap_file(file_path.name) as mapped:
+                pdf_reader = PyPDF2.PdfReader(mapped)
                 for page_num, page in enumerate(pdf_reader.pages):
                     text = page.extract_text()
-                    content.append(f"--- Page {page_num + 1} ---\n{text}")
+                    if page_num:
+                        content.write("\n\n")
+                    content.write(f"--- Page {page_num + 1} ---\n{text}")
 
-        return "\n\n".join(content)
+        return content.getvalue()
 
     async def _process_excel(self, file_path: Path) -> str:
         """Extract data from Excel file"""
 
-        output = []
+        return await asyncio.to_thread(self._extract_excel, file_path)
+
+    @staticmethod
+    def _extract_excel(file_path: Path) -> str:
+        """Extract every sheet as a Markdown table (blocking; runs in a worker thread)"""
+
+        output: List[str] = []
 
-        # Read all sheets
-        excel_file = pd.ExcelFile(file_path)
+        # Read all sheets (calamine handles both .xlsx and .xls)
+        workbook = CalamineWorkbook.from_path(str(file_path))
 
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+        for sheet_name in workbook.sheet_names:
+            rows = workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=True)
 
             output.append(f"--- Sheet: {sheet_name} ---")
-            output.append(df.to_markdown(index=False))
+            output.append(markdown_table(rows))
             output.append("")
 
         return "\n".join(output)
@@ -85,15 +155,26 @@ class DocumentService:
     async def _process_csv(self, file_path: Path) -> str:
         """Extract data from CSV file"""
 
-        df = pd.read_csv(file_path)
-        return f"--- CSV Data ---\n{df.to_markdown(index=False)}"
+        return await asyncio.to_thread(self._extract_csv, file_path)
+
+    @staticmethod
+    def _extract_csv(file_path: Path) -> str:
+        """Extract a CSV file as a Markdown table (blocking; runs in a worker thread)"""
+
+        with open(file_path, newline="", encoding="utf-8-sig") as f:
+            table = markdown_table(csv.reader(f))
+
+        return f"--- CSV Data ---\n{table}"
 
     async def _process_text(self, file_path: Path) -> str:
         """Read text file"""
 
-        content = await temp_manager.read_file(str(file_path.name).split(".")[0])
+        # Read the resolved path directly (file_ids keep their extension)
+        async with aiofiles.open(file_path, "rb") as f:
+            content = await f.read()
 
-        if content:
-            return content.decode("utf-8")
+        return content.decode("utf-8", errors="replace")
 
-        return ""
+
+# Global document service instance
+document_service = DocumentService()
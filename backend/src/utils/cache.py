@@ -0,0 +1,87 @@
+"""In-process LRU cache with optional per-entry TTL"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Bounded LRU cache with optional expiry.
+
+    Operations never await, so they are atomic with respect to the event loop
+    and need no lock when used from coroutines.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Default time-to-live in seconds (None means entries never expire)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        # Expired entries are only dropped when read, so writes also sweep
+        # the whole cache, at most once per default TTL
+        self._next_purge = time.monotonic() + ttl if ttl is not None else None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        value, deadline = item
+        if deadline is not None and deadline <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        now = time.monotonic()
+        if self._next_purge is not None and self._next_purge <= now:
+            self.purge_expired(now)
+            self._next_purge = now + self.ttl
+
+        ttl = self.ttl if ttl is None else ttl
+        deadline = now + ttl if ttl is not None else None
+
+        self._data[key] = (value, deadline)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired entries return default)"""
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+
+        value, deadline = item
+        if deadline is not None and deadline <= time.monotonic():
+            return default
+        return value
+
+    def purge_expired(self, now: Optional[float] = None):
+        """Drop every expired entry"""
+        now = time.monotonic() if now is None else now
+        expired = [
+            key for key, (_, deadline) in self._data.items()
+            if deadline is not None and deadline <= now
+        ]
+        for key in expired:
+            del self._data[key]
+
+    def clear(self):
+        """Remove all entries"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
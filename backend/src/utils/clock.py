@@ -0,0 +1,8 @@
+"""Shared clock helpers"""
+
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """Current time as a timezone-aware UTC datetime"""
+    return datetime.now(timezone.utc)
@@ -1,12 +1,96 @@
 """Logging configuration using structlog"""
 
+import atexit
+import logging
 import structlog
 import sys
+import threading
+from collections import deque
+from typing import Optional
 from src.config import settings
 
 
+# Lines buffered before the oldest are dropped, and lines written per batch
+LOG_QUEUE_SIZE = 8192
+LOG_BATCH_SIZE = 128
+
+
+class QueueWriter:
+    """
+    File-like log sink that never blocks the caller.
+
+    write() only appends to a bounded deque (dropping the oldest line when
+    full); a background thread drains it in batches, so many events share one
+    write syscall on the underlying stream.
+    """
+
+    def __init__(self, stream, maxsize: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE):
+        """
+        Initialize the writer and start its drain thread.
+
+        Args:
+            stream: Binary stream to write to (e.g. sys.stdout.buffer)
+            maxsize: Maximum buffered lines
+            batch_size: Maximum lines per write
+        """
+        self._stream = stream
+        self._batch_size = batch_size
+        self._lines: deque = deque(maxlen=maxsize)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        """Queue a rendered line (deque appends are thread-safe)"""
+        self._lines.append(line)
+        self._wakeup.set()
+
+    def flush(self):
+        """No-op: lines are flushed by the drain thread"""
+
+    def close(self):
+        """Write out any queued lines and stop the drain thread"""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        lines = self._lines
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while lines:
+                batch = []
+                while lines and len(batch) < self._batch_size:
+                    batch.append(lines.popleft())
+                try:
+                    self._stream.write("".join(batch).encode("utf-8", "replace"))
+                    self._stream.flush()
+                except Exception:
+                    # Nowhere to report a broken log stream; drop the batch
+                    pass
+            if self._stopped:
+                return
+
+
+_writer: Optional[QueueWriter] = None
+
+
+def _get_writer() -> QueueWriter:
+    """Create the process-wide log writer on first use"""
+    global _writer
+    if _writer is None:
+        _writer = QueueWriter(sys.stdout.buffer)
+        atexit.register(_writer.close)
+    return _writer
+
+
 def configure_logging():
     """Configure structlog"""
+    level = logging.getLevelName(settings.log_level.upper())
+    if not isinstance(level, int):
+        level = logging.INFO
 
     # Configure structlog
     structlog.configure(
@@ -16,12 +100,10 @@ def configure_logging():
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.dev.ConsoleRenderer() if settings.debug else structlog.processors.JSONRenderer(),
         ],
-        wrapper_class=structlog.make_filtering_bound_logger(20),  # INFO level
+        # Filtered levels become no-op methods, so their events are never rendered
+        wrapper_class=structlog.make_filtering_bound_logger(level),
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        # Rendering stays on the caller; the write happens on the log thread
+        logger_factory=structlog.PrintLoggerFactory(file=_get_writer()),
         cache_logger_on_first_use=True,
     )
-
-
-# Initialize logging
-configure_logging()
@@ -1,15 +1,26 @@
 """Temporary file management utilities"""
 
+import asyncio
+import heapq
+import mmap
 import os
+import time
 import aiofiles
 import uuid
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Set, Tuple
 from src.config import settings
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Bytes held in memory per upload while streaming it to disk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Seconds between background cleanup passes (files older than
+# settings.temp_file_cleanup_interval hours are removed on each pass)
+CLEANUP_PERIOD = 3600
+
 
 class TempFileManager:
     """Manager for temporary uploaded files"""
@@ -17,6 +28,39 @@ class TempFileManager:
     def __init__(self):
         self.temp_dir = Path(__file__).parent.parent.parent / "temp"
         self.temp_dir.mkdir(exist_ok=True)
+        # (created_at, file_id) for files written by this process, oldest first
+        self._created_heap: List[Tuple[float, str]] = []
+        # Files left by earlier runs are not in the heap; the first cleanup scans for them
+        self._swept_existing = False
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background task that removes expired temp files."""
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def stop(self):
+        """Stop the cleanup task."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+
+    async def _cleanup_loop(self):
+        """Run cleanup_old_files now and then every CLEANUP_PERIOD seconds."""
+        while True:
+            try:
+                await self.cleanup_old_files()
+            except Exception as e:
+                logger.error("Temp file cleanup failed", error=str(e))
+            await asyncio.sleep(CLEANUP_PERIOD)
+
+    def _track(self, file_id: str):
+        """Record a new temp file for age-based cleanup"""
+        heapq.heappush(self._created_heap, (time.time(), file_id))
 
     def generate_file_id(self, filename: str) -> str:
         """Generate a unique file ID"""
@@ -33,10 +77,56 @@ class TempFileManager:
 
         async with aiofiles.open(temp_path, "wb") as f:
             await f.write(content)
+        self._track(file_id)
 
         logger.info("File saved to temp", file_id=file_id, path=str(temp_path))
         return temp_path
 
+    def open_writer(self, file_id: str):
+        """Open a temp file for binary writing (use as an async context manager)"""
+        return aiofiles.open(self.get_temp_path(file_id), "wb")
+
+    async def save_upload(
+        self,
+        file_id: str,
+        upload,
+        max_size: int,
+        chunk_size: int = UPLOAD_CHUNK_SIZE
+    ) -> Optional[int]:
+        """
+        Stream an uploaded file to the temp directory in chunks.
+
+        Args:
+            file_id: Target file ID
+            upload: Object with an async read(size) method (e.g. UploadFile)
+            max_size: Maximum allowed size in bytes
+            chunk_size: Bytes read per chunk
+
+        Returns:
+            Bytes written, or None if the upload exceeded max_size (nothing is kept)
+        """
+        temp_path = self.get_temp_path(file_id)
+        size = 0
+
+        try:
+            async with self.open_writer(file_id) as f:
+                while chunk := await upload.read(chunk_size):
+                    size += len(chunk)
+                    if size > max_size:
+                        break
+                    await f.write(chunk)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        if size > max_size:
+            temp_path.unlink(missing_ok=True)
+            return None
+
+        self._track(file_id)
+        logger.info("File saved to temp", file_id=file_id, path=str(temp_path))
+        return size
+
     async def delete_file(self, file_id: str) -> bool:
         """Delete a temp file"""
         temp_path = self.get_temp_path(file_id)
@@ -59,6 +149,27 @@ class TempFileManager:
 
         return None
 
+    def mmap_file(self, file_id: str) -> mmap.mmap:
+        """
+        Map a temp file read-only into memory (blocking; use as a context manager).
+
+        Pages are served from the kernel page cache instead of being copied
+        onto the Python heap.
+
+        Args:
+            file_id: File ID
+
+        Returns:
+            Read-only mmap over the whole file
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the file is empty (empty files cannot be mapped)
+        """
+        with open(self.get_temp_path(file_id), "rb") as f:
+            # The mapping keeps its own reference, so the file can be closed
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
     def get_file_url(self, file_id: str) -> str:
         """Get file URL for API access"""
         return f"/api/files/{file_id}"
@@ -68,18 +179,52 @@ class TempFileManager:
         if max_age_hours is None:
             max_age_hours = settings.temp_file_cleanup_interval
 
-        import time
         cutoff_time = time.time() - (max_age_hours * 3600)
-        deleted_count = 0
 
-        for file_path in self.temp_dir.iterdir():
-            if file_path.is_file() and file_path.stat().st_mtime < cutoff_time:
-                file_path.unlink()
-                deleted_count += 1
+        # Only files past the cutoff are popped; no directory scan or stat
+        expired = []
+        heap = self._created_heap
+        while heap and heap[0][0] < cutoff_time:
+            expired.append(heapq.heappop(heap)[1])
+
+        # Filesystem work runs off the event loop
+        deleted_count = await asyncio.to_thread(self._unlink_all, expired)
+
+        if not self._swept_existing:
+            tracked = {file_id for _, file_id in heap}
+            deleted_count += await asyncio.to_thread(self._remove_untracked_older_than, cutoff_time, tracked)
+            self._swept_existing = True
 
         logger.info("Temp files cleaned up", count=deleted_count)
         return deleted_count
 
+    def _unlink_all(self, file_ids: List[str]) -> int:
+        """Delete temp files that still exist (blocking)"""
+        deleted_count = 0
+        for file_id in file_ids:
+            try:
+                self.get_temp_path(file_id).unlink()
+                deleted_count += 1
+            except FileNotFoundError:
+                # Already removed after processing
+                pass
+        return deleted_count
+
+    def _remove_untracked_older_than(self, cutoff_time: float, tracked: Set[str]) -> int:
+        """Delete old files not written by this process, e.g. after a restart (blocking)"""
+        deleted_count = 0
+
+        # scandir entries carry their type, so only mtime needs a stat call
+        with os.scandir(self.temp_dir) as entries:
+            for entry in entries:
+                if entry.name in tracked:
+                    continue
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff_time:
+                    os.unlink(entry.path)
+                    deleted_count += 1
+
+        return deleted_count
+
 
 # Global temp file manager instance
 temp_manager = TempFileManager()
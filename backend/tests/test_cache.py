@@ -0,0 +1,45 @@
+"""Tests for the in-process LRU cache"""
+
+from src.utils import cache
+from src.utils.cache import LRUCache
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_set_purges_expired_entries_that_are_never_read(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(maxsize=100, ttl=3)
+
+    for i in range(10):
+        lru.set(i, f"value-{i}")
+    assert len(lru) == 10
+
+    clock.now += 5
+    lru.set("fresh", "value")
+
+    assert len(lru) == 1
+    assert lru.get("fresh") == "value"
+
+
+def test_entries_without_ttl_survive_a_purge(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(maxsize=100, ttl=3)
+
+    lru.set("pinned", "value", ttl=float("inf"))
+    lru.set("short", "value")
+
+    clock.now += 5
+    lru.purge_expired()
+
+    assert lru.get("pinned") == "value"
+    assert lru.get("short") is None
@@ -0,0 +1,136 @@
+"""Tests for the chat WebSocket endpoint"""
+
+import asyncio
+from datetime import datetime
+
+import orjson
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from src.api import chat
+from src.models.user import User
+
+
+@pytest.fixture
+def ws_client(monkeypatch):
+    """TestClient for the chat router with auth, storage and the LLM stubbed out"""
+    saved = []
+
+    async def fake_user_from_token(token):
+        return User(id="user-1", username="alice")
+
+    async def fake_conversation_tail(conv_id, user_id, n):
+        return {"id": conv_id, "user_id": user_id, "title": "Test", "messages": []}
+
+    async def fake_stream(messages):
+        for token in ("Hello", ", ", "world"):
+            yield token
+
+    async def fake_add_messages_batch(conv_id, user_id, messages, now=None):
+        saved.append((messages, now))
+        return messages
+
+    monkeypatch.setattr(chat, "get_user_from_token", fake_user_from_token)
+    monkeypatch.setattr(chat, "get_conversation_tail", fake_conversation_tail)
+    monkeypatch.setattr(chat, "get_llm_response_stream", fake_stream)
+    monkeypatch.setattr(chat, "add_messages_batch", fake_add_messages_batch)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    return TestClient(app), saved
+
+
+def _chat_turn(client, content):
+    """Send one message and collect frames up to the final one"""
+    frames = []
+    with client.websocket_connect("/api/chat/ws/conv-1?token=t") as ws:
+        ws.send_text(orjson.dumps({"content": content}).decode())
+        while True:
+            frame = orjson.loads(ws.receive_text())
+            frames.append(frame)
+            if frame["done"]:
+                break
+    return frames
+
+
+def test_streamed_turn_is_saved_with_a_datetime_timestamp(ws_client):
+    client, saved = ws_client
+
+    frames = _chat_turn(client, "hi")
+
+    assert "".join(f["content"] for f in frames) == "Hello, world"
+    assert saved
+    for _, now in saved:
+        assert isinstance(now, datetime)
+        assert now.tzinfo is not None
+
+
+def test_user_message_is_saved_before_the_reply(ws_client):
+    client, saved = ws_client
+
+    _chat_turn(client, "hi")
+
+    roles = [msg["role"] for messages, _ in saved for msg in messages]
+    assert roles == ["user", "assistant"]
+
+
+def test_user_message_is_saved_when_the_stream_fails(ws_client, monkeypatch):
+    client, saved = ws_client
+
+    async def failing_stream(messages):
+        yield "partial"
+        raise RuntimeError("upstream closed")
+
+    monkeypatch.setattr(chat, "get_llm_response_stream", failing_stream)
+
+    frames = _chat_turn(client, "hi")
+
+    assert frames[-1]["error"] == "upstream closed"
+    assert [[msg["content"] for msg in messages] for messages, _ in saved] == [["hi"]]
+
+
+def test_buffered_tokens_flush_while_the_stream_stalls(ws_client, monkeypatch):
+    client, _ = ws_client
+
+    async def stalling_stream(messages):
+        yield "Hel"
+        await asyncio.sleep(0.5)
+        yield "lo"
+
+    monkeypatch.setattr(chat, "get_llm_response_stream", stalling_stream)
+
+    frames = _chat_turn(client, "hi")
+
+    # Without the flush timer both tokens would go out together after the stall
+    assert [f["content"] for f in frames if not f["done"]] == ["Hel", "lo"]
+
+
+def test_auth_lookup_errors_send_an_error_frame(ws_client, monkeypatch):
+    client, _ = ws_client
+
+    async def failing_user_from_token(token):
+        raise RuntimeError("mongo unavailable")
+
+    monkeypatch.setattr(chat, "get_user_from_token", failing_user_from_token)
+
+    with client.websocket_connect("/api/chat/ws/conv-1?token=t") as ws:
+        frame = orjson.loads(ws.receive_text())
+
+    assert frame["done"] is True
+    assert frame["error"] == "Authentication failed"
+
+
+def test_oversized_multibyte_text_frames_are_rejected(ws_client):
+    client, saved = ws_client
+
+    # Under the cap in characters, about three times over it in UTF-8 bytes
+    content = "汉" * (chat.MAX_WS_MESSAGE_SIZE // 2)
+
+    with client.websocket_connect("/api/chat/ws/conv-1?token=t") as ws:
+        ws.send_text(orjson.dumps({"content": content}).decode())
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_text()
+
+    assert exc_info.value.code == 1009
+    assert not saved
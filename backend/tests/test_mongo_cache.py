@@ -0,0 +1,44 @@
+"""Tests for the db layer's cache generations"""
+
+from src.db import mongo
+from src.utils.cache import LRUCache
+
+
+def test_generations_live_in_the_bounded_cache(monkeypatch):
+    monkeypatch.setattr(mongo, "_user_cache", LRUCache(maxsize=10, ttl=30))
+
+    for i in range(100):
+        mongo._invalidate_user(f"user-{i}")
+
+    assert len(mongo._user_cache) == 10
+    assert not hasattr(mongo, "_user_generations")
+
+
+def test_invalidation_hides_the_cached_document(monkeypatch):
+    cache = LRUCache(maxsize=10, ttl=30)
+    monkeypatch.setattr(mongo, "_user_cache", cache)
+
+    key = ("user-1", mongo._get_generation(cache, "user-1"))
+    cache.set(key, {"id": "user-1", "is_banned": False})
+
+    mongo._invalidate_user("user-1")
+
+    new_key = ("user-1", mongo._get_generation(cache, "user-1"))
+    assert new_key != key
+    assert cache.get(new_key) is None
+
+
+def test_evicted_generations_are_not_reused(monkeypatch):
+    cache = LRUCache(maxsize=2, ttl=30)
+    monkeypatch.setattr(mongo, "_conversation_cache", cache)
+
+    mongo._invalidate_conversations("user-1")
+    first = mongo._conversation_generation("user-1")
+
+    # Push the generation out, then bump again
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert mongo._conversation_generation("user-1") == 0
+    mongo._invalidate_conversations("user-1")
+
+    assert mongo._conversation_generation("user-1") not in (0, first)
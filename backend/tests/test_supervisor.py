@@ -0,0 +1,146 @@
+"""Tests for the supervisor agent"""
+
+import asyncio
+
+import pytest
+
+from src.agents import supervisor as supervisor_module
+from src.agents.supervisor import SupervisorAgent
+from src.config import settings
+
+
+def _echo_summarizer(monkeypatch, calls):
+    """Stub the LLM so each summary is the transcript it was given"""
+    async def fake_llm(messages, **kwargs):
+        calls.append(messages[-1]["content"])
+        return messages[-1]["content"]
+
+    monkeypatch.setattr(supervisor_module, "get_llm_response", fake_llm)
+
+
+async def test_history_summaries_are_reused_while_the_tail_moves(monkeypatch):
+    monkeypatch.setattr(settings, "chat_history_max_turns", 10)
+    supervisor = SupervisorAgent()
+    calls = []
+    _echo_summarizer(monkeypatch, calls)
+
+    conversation = [{"role": "user", "content": f"<m{i}>"} for i in range(100)]
+    for total in range(60, 100, 2):
+        tail = conversation[total - 50:total]
+        await supervisor._trim_history(tail, total, "conv-1")
+
+    # Twenty turns touch blocks 1-7 (ten messages each): one call per block
+    assert len(calls) == 7
+
+
+async def test_trimmed_history_is_bounded_and_loses_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "chat_history_max_turns", 10)
+    supervisor = SupervisorAgent()
+    _echo_summarizer(monkeypatch, [])
+
+    conversation = [{"role": "user", "content": f"<m{i}>"} for i in range(120)]
+    for total in range(22, 120, 2):
+        tail = conversation[max(total - 50, 0):total]
+        trimmed = await supervisor._trim_history(tail, total, "conv-1")
+
+        summary, recent = trimmed[0], trimmed[1:]
+        assert summary["role"] == "system"
+        assert 0 < len(recent) <= 20
+        assert recent == tail[-len(recent):]
+        for msg in tail[:-len(recent)]:
+            assert msg["content"] in summary["content"]
+
+
+async def test_concurrent_identical_messages_share_one_routing_call(monkeypatch):
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    supervisor = SupervisorAgent()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fake_llm(messages, **kwargs):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return '{"intent": "general_chat", "confidence": 0.8, "agent": null, "reasoning": "chat"}'
+
+    monkeypatch.setattr(supervisor_module, "get_llm_response", fake_llm)
+
+    pending = [
+        asyncio.create_task(supervisor.recognize_intent("Tell me a joke"))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*pending)
+
+    assert calls == 1
+    assert {r.intent for r in results} == {"general_chat"}
+    assert not supervisor._intent_inflight
+
+
+async def test_different_messages_each_get_their_own_routing_call(monkeypatch):
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    supervisor = SupervisorAgent()
+    seen = []
+
+    async def fake_llm(messages, **kwargs):
+        seen.append(messages[-1]["content"])
+        return '{"intent": "general_chat", "confidence": 0.8, "agent": null, "reasoning": "chat"}'
+
+    monkeypatch.setattr(supervisor_module, "get_llm_response", fake_llm)
+
+    await asyncio.gather(
+        supervisor.recognize_intent("Tell me a joke"),
+        supervisor.recognize_intent("Write a haiku")
+    )
+
+    assert sorted(seen) == ["Tell me a joke", "Write a haiku"]
+
+
+@pytest.mark.parametrize("message", [
+    "chicken stock recipe",
+    "is this jacket in stock?",
+    "stock photo sites",
+    "explain crypto graphy",
+    "what does ticker tape mean",
+    "I paid $5 for lunch",
+])
+def test_ambiguous_words_are_not_fast_routed_to_finance(message):
+    assert SupervisorAgent._fast_route(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "What's the price of Bitcoin?",
+    "AAPL stock price today",
+    "how is $TSLA doing",
+    "nasdaq close",
+])
+def test_unambiguous_financial_terms_are_fast_routed(message):
+    result = SupervisorAgent._fast_route(message)
+    assert result is not None
+    assert result.agent == "FinancialAnalysis"
+
+
+class FakeBadRequest(Exception):
+    """Stand-in for a provider's HTTP 400 error"""
+
+
+async def test_rejected_response_format_is_retried_without_it(monkeypatch):
+    monkeypatch.setattr(settings, "intent_cache_enabled", False)
+    monkeypatch.setattr(supervisor_module, "BAD_REQUEST_ERRORS", (FakeBadRequest,))
+    supervisor = SupervisorAgent()
+    sent_formats = []
+
+    async def fake_llm(messages, **kwargs):
+        sent_formats.append("response_format" in kwargs)
+        if "response_format" in kwargs:
+            raise FakeBadRequest("response_format is not supported")
+        return 'Sure: {"intent": "poem", "confidence": 0.8, "agent": null, "reasoning": "creative"}'
+
+    monkeypatch.setattr(supervisor_module, "get_llm_response", fake_llm)
+
+    first = await supervisor.recognize_intent("Write a haiku")
+    second = await supervisor.recognize_intent("Write a limerick")
+
+    assert first.intent == second.intent == "poem"
+    assert sent_formats == [True, False, False]
@@ -0,0 +1,48 @@
+"""Tests for temp file cleanup"""
+
+import asyncio
+import os
+import time
+
+from src.utils.temp_manager import TempFileManager
+
+
+async def test_cleanup_removes_only_expired_files(tmp_path):
+    manager = TempFileManager()
+    manager.temp_dir = tmp_path
+
+    await manager.save_file("fresh.txt", b"new")
+    await manager.save_file("expired.txt", b"old")
+    manager._created_heap = [
+        (time.time() - 2 * 3600, "expired.txt"),
+        (time.time(), "fresh.txt"),
+    ]
+
+    # Left by an earlier run, so only found by the first directory scan
+    leftover = tmp_path / "leftover.txt"
+    leftover.write_bytes(b"old")
+    old = time.time() - 2 * 3600
+    os.utime(leftover, (old, old))
+
+    deleted = await manager.cleanup_old_files(max_age_hours=1)
+
+    assert deleted == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh.txt"]
+    assert [file_id for _, file_id in manager._created_heap] == ["fresh.txt"]
+
+
+async def test_start_runs_a_cleanup_pass(tmp_path, monkeypatch):
+    manager = TempFileManager()
+    manager.temp_dir = tmp_path
+    passes = []
+
+    async def fake_cleanup():
+        passes.append(True)
+
+    monkeypatch.setattr(manager, "cleanup_old_files", fake_cleanup)
+
+    manager.start()
+    await asyncio.sleep(0)
+    await manager.stop()  # cancels the sleep after the first pass
+
+    assert passes == [True]
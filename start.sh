@@ -55,6 +55,9 @@ if ! [[ "$FRONTEND_PORT" =~ ^[0-9]+$ ]]; then
     exit 1
 fi
 
+# Allow the frontend's origin through the backend's CORS policy
+export CORS_ORIGINS="${CORS_ORIGINS:-http://localhost:$FRONTEND_PORT,http://127.0.0.1:$FRONTEND_PORT}"
+
 echo "🚀 Starting AI Chat Assistant..."
 echo ""
 
@@ -135,7 +138,7 @@ trap cleanup SIGINT SIGTERM
 cd "$BACKEND_DIR"
 echo "   Starting backend on http://localhost:6969 (with auto-reload)"
 echo "   Backend will automatically reload when Python files change"
-.venv/bin/python3 -m uvicorn src.main:app --host 0.0.0.0 --port 6969 --reload > /tmp/backend.log 2>&1 &
+.venv/bin/python3 -m uvicorn src.main:app --host 0.0.0.0 --port 6969 --reload --ws-max-size 65536 > /tmp/backend.log 2>&1 &
 BACKEND_PID=$!
 
 # Wait a moment for backend to start